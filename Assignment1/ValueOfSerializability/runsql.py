@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+runsql.py
+
+Runs sql files (init.sql, load.sql, ...) against the database described
+in ../db2.py, through the driver of the harnesses (-D sqlite for a
+local SQLite database).
+
+python runsql.py [options] sqlfile ...
+The runner is shared by all experiments, see ../../driver/cli.py
+"""
+
+import sys
+
+### Database parameters (../db2.py) and shared driver (../../driver)
+sys.path.append("..")
+sys.path.append("../..")
+from driver.cli import main
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,8 +18,8 @@ import timeit
 import multiprocessing
 import random
 import os
-import ibm_db
 import time
+from Queue import Empty
 
 
 ### Experiment parameters (default values)
@@ -27,8 +27,9 @@ NBRUNS         = 5          # Number of runs (-r:, --runs=)
 NBSWAPS        = 100        # Number of swaps (-s:, --swaps=)
 NBSWAPTHREADS  = 10         # Number of swap threads (-t:, --threads=)
 RANGE_LOW      = 1          # Lower bound of the range for account number
-RANGE_UP       = 1000000    # Upper bound of the range for account number
+RANGE_UP       = 1000000    # Upper bound of the range for account number (-m:, --maxaccount=)
 ISOL_LEVEL     = 'RR'
+BUCKET         = 0.1        # Seconds per bucket of the throughput series (-b:, --bucket=)
 
 ### Output parameters (default values)
 OUTPUT_FILE_PATH  = '.'   # Path of the output file output.txt (append)
@@ -36,9 +37,21 @@ OUTPUT_FILE_PATH  = '.'   # Path of the output file output.txt (append)
 ### Database parameters (DATABASE; HOSTNAME; PORT; USERNAME; PASSWORD)
 sys.path.append("..")
 from db2 import *
+sys.path.append("../..")
+from datagen import Usage
+from bench import histogram, throughput, pool
+import driver
+DRIVER = driver.configured()
+
+# Database driver (ibm_db or sqlite), set before the threads start
+db = None
 
 # Process Manager data structure
 q = None
+# {thread: {statement type: histogram}} of the runs, and (start, {thread:
+# throughput series}) of each run
+latencies = {}
+series = []
 
 """"
 Swapping of balance values.
@@ -50,19 +63,20 @@ We avoid deadlocks because of the clustered index on
 account number that garantees that account numbers
 are accessed in acending order.
 """
-def swap(q):
+def swap(q, results, name):
     swap1_str= q[0]; swap2_str = q[1]
+    latency = {}; completed = throughput.Series(BUCKET)
     # Connect to DB
-    conn = ibm_db.pconnect(DATABASE, USERNAME, PASSWORD)
-    if conn is None: raise Usage(ibm_db.conn_errormsg())
-    ibm_db.autocommit(conn, ibm_db.SQL_AUTOCOMMIT_OFF)
+    conn = db.pconnect(DATABASE, USERNAME, PASSWORD)
+    if conn is None: raise Usage(db.conn_errormsg())
+    db.autocommit(conn, db.SQL_AUTOCOMMIT_OFF)
     # Set isolation level
-    ret = ibm_db.exec_immediate(conn, "SET CURRENT ISOLATION = "+ISOL_LEVEL)
+    ret = db.exec_immediate(conn, "SET CURRENT ISOLATION = "+ISOL_LEVEL)
     # Prepare Statements
-    swap1_stmt = ibm_db.prepare(conn, swap1_str)
+    swap1_stmt = db.prepare(conn, swap1_str)
     if (swap1_stmt == False):
         raise Usage("Failed to prepare swap1 query")
-    swap2_stmt = ibm_db.prepare(conn, swap2_str)
+    swap2_stmt = db.prepare(conn, swap2_str)
     if (swap2_stmt == False):
         raise Usage("Failed to prepare swap2 update")
     # Execute Statements
@@ -70,44 +84,56 @@ def swap(q):
     for i in range(nbrep):
         x = random.randint(RANGE_LOW, RANGE_UP/2)
         y = random.randint(x,RANGE_UP)
-        if ibm_db.execute(swap1_stmt, (x,)) == False:
+        begin = histogram.clock()
+        if db.execute(swap1_stmt, (x,)) == False:
             raise Usage("Failed to execute the swap1 query (x)")
-        valX = ibm_db.fetch_tuple(swap1_stmt)
+        valX = db.fetch_tuple(swap1_stmt)
         if valX == False:
             raise Usage("Failed to iterate over the swap1 result set (x)")
-        if ibm_db.execute(swap1_stmt, (y,)) == False:
+        begin = histogram.record(latency, 'swap1', begin)
+        if db.execute(swap1_stmt, (y,)) == False:
             raise Usage("Failed to execute the swap1 query (y)")
-        valY = ibm_db.fetch_tuple(swap1_stmt)
+        valY = db.fetch_tuple(swap1_stmt)
         if valY == False:
             raise Usage("Failed to iterate over the swap1 result set (y)")
+        histogram.record(latency, 'swap1', begin)
         time.sleep(0.1)
-        if ibm_db.execute(swap2_stmt, (valY[0],x)) == False:
+        begin = histogram.clock()
+        if db.execute(swap2_stmt, (valY[0],x)) == False:
             raise Usage("Failed to execute the swap2 query (x, valY)")
-        if ibm_db.execute(swap2_stmt, (valX[0],y)) == False:
+        begin = histogram.record(latency, 'swap2', begin)
+        if db.execute(swap2_stmt, (valX[0],y)) == False:
             raise Usage("Failed to execute the swap1 query (y, valX)")
-        ibm_db.commit(conn)
+        begin = histogram.record(latency, 'swap2', begin)
+        db.commit(conn)
+        completed.record(histogram.record(latency, 'commit', begin))
     # Disconnect from DB
-    status = ibm_db.close(conn)
+    status = db.close(conn)
     if status == False: raise Usage("Failed to close db connection.\n")
+    results.put((name, latency, completed))
 
 
-def summation(q):
+def summation(q, results, name):
     sum_str = q[2]
+    latency = {}; completed = throughput.Series(BUCKET)
     # Connect to DB
-    conn = ibm_db.pconnect(DATABASE, USERNAME, PASSWORD)
+    conn = db.pconnect(DATABASE, USERNAME, PASSWORD)
     if conn is None:
-        raise Usage(ibm_db.conn_errormsg())
-    ibm_db.autocommit(ibm_db.SQL_AUTOCOMMIT_OFF)
+        raise Usage(db.conn_errormsg())
+    db.autocommit(conn, db.SQL_AUTOCOMMIT_OFF)
     # Set isolation level
-    ret = ibm_db.exec_immediate(conn, "SET CURRENT ISOLATION = "+ISOL_LEVEL)
+    ret = db.exec_immediate(conn, "SET CURRENT ISOLATION = "+ISOL_LEVEL)
     # Prepare statement
-    sum_stmt   = ibm_db.prepare(conn, sum_str)
+    sum_stmt   = db.prepare(conn, sum_str)
     if (sum_stmt == False): raise Usage("Failed to prepare sum query")
     # Execute statement
-    if ibm_db.execute(sum_stmt) == False:
+    begin = histogram.clock()
+    if db.execute(sum_stmt) == False:
         raise Usage("Failed to execute the sum query")
-    sum= ibm_db.fetch_tuple(sum_stmt)
-    ibm_db.commit(conn)
+    sum= db.fetch_tuple(sum_stmt)
+    begin = histogram.record(latency, 'sum', begin)
+    db.commit(conn)
+    completed.record(histogram.record(latency, 'commit', begin))
     # Print result set to output file
     try:
       f = open(OUTPUT_FILE_PATH+'/output.txt', 'a')
@@ -118,8 +144,9 @@ def summation(q):
     finally:
       f.close()
     # Disconnect from DB
-    status = ibm_db.close(conn)
+    status = db.close(conn)
     if status == False: raise Usage("Failed to close db connection.\n")
+    results.put((name, latency, completed))
 
 """
 Thread wrapper class
@@ -131,14 +158,30 @@ class Thread(multiprocessing.Process):
 
 def experiment(q):
     ThreadL = []
+    # latencies of the statements of each thread, and the transactions it
+    # completed in each bucket, put at its end
+    results = multiprocessing.Queue()
+    workers = {}
+    series.append((time.time(), workers))
     # Launch swap threads
     for n in range(NBSWAPTHREADS):
-        ThreadL.append(Thread(swap,q))
+        ThreadL.append(Thread(swap, q, results, 'swap'+str(n)))
     # Launch Summation thread
-    ThreadL.append(Thread(summation, q))
-    # Barrier
+    ThreadL.append(Thread(summation, q, results, 'summation'))
+    # Barrier: the latencies are taken from the queue as the threads end
+    # (a process exits once what it put is consumed; a failed thread puts
+    # nothing)
+    while not results.empty() or any([t.is_alive() for t in ThreadL]):
+        try:
+            result = results.get(True, 0.1)
+        except Empty:
+            continue
+        pool.collect([result], latencies, workers)
     for t in ThreadL:
         t.join()
+    # a failed thread has reported its error; the run is not valid
+    if any([t.exitcode != 0 for t in ThreadL]):
+        raise Usage("A swap or summation thread failed")
 
 help_message = '''
 python sumNswap.py [options]
@@ -149,19 +192,33 @@ options:
 -r, --runs=      : number of repetitions (< 100)
 -i, --isol=      : isolation level ('UR', 'CS', 'RS','RR')
 -o, --output=    : path to output file (result.txt)
+-b, --bucket=    : seconds per bucket of the throughput series (default 0.1)
+-m, --maxaccount=: highest account number drawn by the swaps (default 1000000)
+-D, --driver=    : database driver ('ibm_db' or 'sqlite', default DRIVER of ../db2.py)
 
 Executes sum and swap transactions against the database described in ../db2.py
-and prints timing
+and prints timing, then the latencies of the statements over all the runs
+(mean, p50, p95, p99 and max, in seconds): swap1 (read of a balance),
+swap2 (update of a balance), sum and commit, over all the threads and
+per thread. The transactions completed (swaps and sums) are also counted
+in buckets of -b seconds, and a throughput series is printed for each run
+(all the threads, then each thread; the first and last buckets are partial)
 
 Example: python sumNswap.py -t10 -s1000 -r5 -iCS
-'''
 
-class Usage(Exception):
-    def __init__(self, msg):
-        self.msg = msg
+Without DB2, on a local SQLite database (where all isolation levels are
+serializable):
+python gentable.py 100000 accounts.data accountspec 1
+python runsql.py -D sqlite init.sql load.sql
+python sumNswap.py -D sqlite -t10 -s100 -r5 -m99999
+
+The swaps draw account numbers from 1 to -m: gentable numbers the N
+accounts from 0 to N-1, so -m should be N-1 for a smaller table.
+'''
 
 def main(argv=None):
-    global NBRUNS, NBSWAPS, NBSWAPTHREADS, RANGE_LOW, RANGE_UP, ISOL_LEVEL
+    global NBRUNS, NBSWAPS, NBSWAPTHREADS, RANGE_LOW, RANGE_UP, ISOL_LEVEL, BUCKET
+    global DRIVER, db
     global OUTPUT_FILE_PATH
     global q
     try:
@@ -170,8 +227,8 @@ def main(argv=None):
 
             try:
                 opts, args = getopt.getopt(argv[1:],
-                "ho:vr:s:t:g:i:",
-                ["help", "output=", "runs=","swaps=", "threads=", "isol="])
+                "ho:vr:s:t:g:i:b:D:m:",
+                ["help", "output=", "runs=","swaps=", "threads=", "isol=", "bucket=", "driver=", "maxaccount="])
             except getopt.error, msg:
                 raise Usage(msg)
     
@@ -199,7 +256,20 @@ def main(argv=None):
             if option in ("-o", "--output"):
                 if not os.path.exists(value): raise Usage("Result file path does not exist")
                 OUTPUT_FILE_PATH= value
+            if option in ("-b", "--bucket"):
+                v = float(value)
+                if (v <= 0): raise Usage("Bucket out of bounds")
+                BUCKET = v
+            if option in ("-D", "--driver"):
+                if not value in driver.DRIVERS: raise Usage("Driver not supported (ibm_db or sqlite)")
+                DRIVER = value
+            if option in ("-m", "--maxaccount"):
+                v = int(value)
+                if (v < 2*RANGE_LOW): raise Usage("Max account out of bounds")
+                RANGE_UP = v
     
+        db = driver.load(DRIVER)
+
         # Verify preconditions: required sql files exist
         try:
             f = open('sum.sql', 'r')
@@ -237,6 +307,12 @@ def main(argv=None):
             for timing in timings:
                 s = str(timing)
                 print s        
+            for line in histogram.report(latencies):
+                print line
+            for line in throughput.report(series, 'transactions'):
+                print line
+        except Usage:
+            raise
         except: 
             raise Usage(t.print_exc())
             
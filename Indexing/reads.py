@@ -15,12 +15,13 @@ Copyright (c) Philippe Bonnet 2010 . All rights reserved.
 import sys
 import getopt
 import timeit
+import multiprocessing
+import multiprocessing.util
 import random
 import os
 import re
-import ibm_db
 import time
-from string import maketrans
+from itertools import islice, repeat
 
 ### Experiment parameters (default values)
 NBRUNS         = 1    # Number of runs 
@@ -29,7 +30,16 @@ NBQUERIES       = 1                 # Nb of queries per run
 NBTUPLES       = 1000000
 SPECFILE       = 'employeesspec'
 NBKEYS         = 1
+SEED           = None   # Seed of the generated parameters (None: random)
+LOADFILE       = None   # Load file of the table (None: parameters follow SPECFILE)
 ATTLIST         = []
+RATE           = 0      # Queries per second offered in open loop (0: closed loop)
+ARRIVAL        = 'constant' # Arrival process in open loop (constant or poisson)
+NBCLIENTS      = 1      # Number of client processes (open loop, or concurrent closed loop if > 1)
+PULLSIZE       = 100    # Parameters taken at a time from the work queue by a client (closed loop)
+BUCKET         = 0.1    # Seconds per bucket of the throughput series
+FETCH          = 'row'  # Consumption of the result sets (row, block, skip or count)
+FETCHSIZE      = 100    # Rows per fetch in block mode
 
 ### Database parameters (DATABASE; HOSTNAME; PORT; USERNAME; PASSWORD)
 sys.path.append("..")
@@ -38,141 +48,201 @@ from db2 import HOSTNAME
 from db2 import PORT
 from db2 import USERNAME
 from db2 import PASSWORD
+from datagen import GenWrites, Usage
+import driver
+DRIVER = driver.configured()
+from bench import openloop, histogram, throughput, pool
 
 ### Timed function parameter
 query_str = None
 g = None
-    
+
+# Database driver (ibm_db or sqlite), set before the clients start
+db = None
+
+# Open loop: client processes, queue of queries, and (arrival, begin, end) of each query
+p = None
+work = None
+times = []
+arrival_random = None
+
+# {client: {statement type: histogram}} of the runs, (start, {client:
+# throughput series}) of each run, and {rows: queries} of each run
+latencies = {}
+series = []
+fetched = []
+
+# Connection and prepared query of a client process, kept for the whole session
+conn = None
+query_stmt = None
+measures = None # latencies and throughput series of the current run of a client
+sizes = {}      # {rows: queries} of the result sets of the current run of a client
+
+def dsn():
+    return 'DRIVER={IBM DB2 ODBC DRIVER};DATABASE='+DATABASE+';HOSTNAME='+HOSTNAME+';PORT='+str(PORT)+'; PROTOCOL=TCPIP;UID='+USERNAME+';PWD='+PASSWORD+';'
+
+def connect(query_str):
+    global conn, query_stmt
+    conn = db.pconnect(dsn(),'','')
+    if conn is None: raise Usage(db.conn_errormsg())
+    query_stmt = db.prepare(conn, query_str)
+    if (query_stmt == False): raise Usage("Failed to prepare query")
+    # Disconnect when the client exits, at the end of the session
+    multiprocessing.util.Finalize(None, disconnect, exitpriority=10)
+
+def disconnect():
+    status = db.close(conn)
+    if status == False: raise Usage("Failed to close db connection.\n") 
+
+def collected():
+    # the measures of the client during the run, with the sizes of the
+    # result sets of its queries
+    global sizes
+    n, sizes = sizes, {}
+    return measures.collected(n)
+
+def collect(results):
+    # merges the measures of the clients of the current run, per client,
+    # and the sizes of their result sets
+    for n, in pool.collect(results, latencies, series[-1][1]):
+        for rows, queries in n.iteritems():
+            fetched[-1][rows] = fetched[-1].get(rows, 0) + queries
+
+def resultsets(r, n):
+    # one line describing the result sets of run r ({rows: queries})
+    queries = sum(n.values())
+    if queries == 0:
+        return "result sets run %d: no query" % r
+    rows = sum([k*v for k, v in n.iteritems()])
+    return ("result sets run %d: queries %d, rows %d, mean %.1f, min %d, max %d" %
+            (r, queries, rows, rows/float(queries), min(n), max(n)))
+
+def counted(query_str):
+    # the query returning the number of rows of query_str (FETCH count)
+    return "select count(*) from ("+query_str.strip().rstrip(';')+") as q"
+
+def fetch(stmt):
+    # consumes the result set of stmt; returns its number of rows
+    if FETCH == 'count':
+        # a single row, the number of rows counted by the server
+        row = db.fetch_tuple(stmt)
+        return row[0]
+    nbtuples = 0
+    if FETCH == 'block':
+        rows = db.fetch_many(stmt, FETCHSIZE)
+        while rows:
+            nbtuples += len(rows)
+            rows = db.fetch_many(stmt, FETCHSIZE)
+    elif FETCH == 'skip':
+        # the cursor advances, the rows are not built
+        while db.fetch_row(stmt) == True:
+            nbtuples += 1
+    else:
+        while (db.fetch_tuple(stmt) != False):
+            nbtuples += 1
+    return nbtuples
+
+def stream(nbParams, g):
+    # parameters of the NBQUERIES queries of a run (None if the query has
+    # none), generated as they are used (only the -a columns); each run
+    # has the same queries
+    if (nbParams == 0):
+        return repeat(None, NBQUERIES)
+    g.rewind()
+    return islice(g, NBQUERIES)
+
+def query(u):
+    # one query of a client, with parameters u (None if none)
+    start = begin = histogram.clock()
+    if u is None:
+        ret = db.execute(query_stmt)
+    else:
+        ret = db.execute(query_stmt, u)
+    if ret == False:
+        raise Usage("Failed to execute the query")
+    begin = histogram.record(measures.latency, 'execute', begin)
+    nbtuples = fetch(query_stmt)
+    histogram.record(measures.latency, 'fetch', begin)
+    measures.completed.record(histogram.record(measures.latency, 'query', start))
+    sizes[nbtuples] = sizes.get(nbtuples, 0) + 1
+
+def serve(i):
+    return openloop.serve(work, query), collected()
+
+def pull(i):
+    # a client of the closed loop executes the queries of the parameters
+    # it takes from the work queue, until the end of the run (None)
+    while True:
+        unit = work.get()
+        if unit is None:
+            return collected()
+        for u in unit:
+            query(u)
+
+def startclients(query_str):
+    # Starts the client processes, and waits until each of them is
+    # connected with its query prepared
+    global work
+    if RATE > 0:
+        # open loop: the queue is not bounded, queries wait for a client
+        work = multiprocessing.Queue()
+    else:
+        work = multiprocessing.Queue(2*NBCLIENTS)
+    return pool.start(NBCLIENTS, connect, (query_str,), 'client')
+
+def openexperiment(nbParams,g):
+    # Queries arrive at RATE per second, whether the clients keep up or not
+    r = p.map_async(serve, range(NBCLIENTS), 1)
+    openloop.dispatch(work, stream(nbParams, g), openloop.arrivals(RATE, NBQUERIES, ARRIVAL, arrival_random), NBCLIENTS)
+    for l, c in r.get():
+        times.extend(l)
+        collect([c])
+
+def clientexperiment(nbParams,g):
+    # The clients execute queries as fast as they can, each on its own
+    # connection, with the parameters they pull from the work queue,
+    # PULLSIZE at a time; put blocks while the queue is full, so that
+    # the parameters are generated as they are used
+    r = p.map_async(pull, range(NBCLIENTS), 1)
+    unit = []
+    for u in stream(nbParams, g):
+        unit.append(u)
+        if len(unit) == PULLSIZE:
+            work.put(unit)
+            unit = []
+    if unit:
+        work.put(unit)
+    for i in range(NBCLIENTS):
+        work.put(None)
+    collect(r.get())
+
 def experiment(query_str,g):
+    global conn, query_stmt
     # generate nb of parameters for query
     matchList  = re.findall('\?', query_str)
     nbParams   = len(matchList)
     if (len(ATTLIST) != nbParams): raise Usage("Attribute missing (add appropriate -a option)")
+    series.append((time.time(), {}))
+    fetched.append({})
+    if RATE > 0:
+        return openexperiment(nbParams,g)
+    if NBCLIENTS > 1:
+        return clientexperiment(nbParams,g)
     # Connect to DB
-    conn = ibm_db.pconnect('DRIVER={IBM DB2 ODBC DRIVER};DATABASE='+DATABASE+';HOSTNAME='+HOSTNAME+';PORT='+str(PORT)+'; PROTOCOL=TCPIP;UID='+USERNAME+';PWD='+PASSWORD+';','','')
-    if conn is None: raise Usage(ibm_db.conn_errormsg())
+    conn = db.pconnect(dsn(),'','')
+    if conn is None: raise Usage(db.conn_errormsg())
     # Prepare statement
-    query_stmt   = ibm_db.prepare(conn, query_str)
+    query_stmt   = db.prepare(conn, query_str)
     if (query_stmt == False): raise Usage("Failed to prepare query")
     # Execute statement
-    for i in range(NBQUERIES): 
-        if (nbParams == 0): 
-            if ibm_db.execute(query_stmt) == False:
-                raise Usage("Failed to execute the query")
-        else:
-            t = g.getWrite(i)
-            l = list(t)
-            u = [l[j] for j in range(len(l)) if j in ATTLIST]
-            if ibm_db.execute(query_stmt, tuple(u)) == False:
-                raise Usage("Failed to execute the query") 
-        nbtuples = 0
-        while (ibm_db.fetch_tuple(query_stmt) != False):
-            nbtuples += 1
-        print "Query"+str(i)+": "+str(nbtuples)+" fetched."
+    for u in stream(nbParams, g):
+        query(u)
+    collect([collected()])
     # Disconnect from DB
-    status = ibm_db.close(conn)
+    status = db.close(conn)
     if status == False: raise Usage("Failed to close db connection.\n") 
  
 
-"""
-Gentable class
-"""
-class GenWrites(object):
-    def __init__(self, numrows, numkeys, numwrites, specfile):
-        self.numrows   = numrows
-        self.numkeys   = numkeys
-        self.numwrites = numwrites
-        # Extract columns specifications from specfile
-        print "reading specfile..."
-        f = open(specfile)
-        filelines = f.readlines()
-        alllines = [(l.strip()).translate(maketrans("",""),"\n") for l in filelines if len(l.translate(maketrans("",""),"\n")) >1] # remove empty lines
-        lines = [ll for ll in [l for l in alllines if l[0]!='/'] if ll[0]!=' ']   # remove comments
-        colspecs = [l.split(' ') for l in lines]
-        numcols = len(colspecs) 
-        # Generate Table based on columns specifications
-        print "generating rows..."
-        self.writes = self.gentable(numcols, colspecs)
-        self.counter = 0
-
-    def getWrite(self,cursor):
-        if cursor < 0: return None
-        elif cursor >= len(self.writes) : return None
-        else:
-            return self.writes[cursor]
-            
-    def getWrites(self,count):
-        s = self.counter
-        self.counter += count
-        return [self.getWrite(c) for c in range(s,s+count)]
-
-    def sample_wr(self,population, k):
-        # Chooses k random elements (with replacement) from a population
-        n = len(population)
-        _random, _int = random.random, int  # speed hack 
-        result = [None] * k
-        for i in xrange(k):
-            j = _int(_random() * n)
-            result[i] = population[j]
-        return result
-
-    def gentable(self,numcols, colspecs):
-        attvalues     = [[]]*numcols
-        schema   = [[]]*numcols
-        i = 0
-        while i < numcols:
-            # spec is of the form -- attribute draw basevalue distribution
-            # for now we ignore distribution
-            spec = colspecs[i]
-            attribute = spec[0]
-            draw = float(spec[1])
-            basevalue = 0
-            if len(spec)>2:
-                basevalue = int(spec[2])
-            # generate the numbers used to generate attribute values
-            if draw == 1:
-                numlist = random.sample(range(self.numrows),self.numwrites)
-            # for now we assume uniform distribution        
-            elif draw < 1:
-                numvalues = int(round(self.numrows*draw, 0))
-                numlist   = self.sample_wr(range(numvalues), self.numwrites)
-            elif draw > 1:
-                numvalues = int(round(draw, 0))
-                if numvalues >= self.numwrites:
-                    numlist = random.sample(range(numvalues),self.numwrites)
-                else:
-                    numlist = self.sample_wr(range(numvalues),self.numwrites)
-            # adjust list of numbers to account for basevalue   
-            numlist = [num+basevalue for num in numlist]        
-            # distinction between numerical attributes 'n' and alphanumerical attributes ATT_NAME
-            if attribute == 'n':
-                att = ''
-                s = 'numeric'
-                attvalues[i] = [num for num in numlist] 
-            else:
-                att = attribute
-                s = 'varchar('+str(max(numlist))+')'   
-                attvalues[i] = [att+str(num) for num in numlist]    
-            # record schema
-            schema[i] = s
-            i += 1
-        # remove duplicates for the key values
-        if self.numkeys == numcols:
-            # - use sets to eliminate duplicates
-            tuples = zip(*attvalues)
-            writes = set(tuples)
-        elif self.numkeys < numcols:
-            # - use dictionary to eliminate duplicates
-            keys = zip(*attvalues[:self.numkeys])
-            rest = zip(*attvalues[self.numkeys:])
-            dico = dict(zip(keys,rest))
-            writes = set([k+v for k,v in dico.items()])
-        else:
-            print "error in specfile: numkeys > numcols\n"
-            system.exit(2)
-        print "done generating rows..."
-        return list(writes)
-
 
     
 help_message = '''
@@ -180,12 +250,21 @@ python reads.py [options]
 options:
 -h, --help       : this help message
 -r, --runs=      : number of runs (< 100) -- should be 1 if cold buffer
--q, --queries=   : number of queries per run
+-q, --queries=   : number of queries per run (e.g. 1000000)
 -p, --path=      : complete path to query file
 -s, --specfile=  : specification file (gentable format)
 -k, --numkeys=   : number of keys in specification file
 -m, --numtuples= : max number of tuples in specification file (should be greater than -n)
 -a, --attribute= : position of the attribute referenced in update file (multiple -a considered in order)
+-S, --seed=      : seed (integer) making the generated parameters reproducible
+-L, --loadfile=  : load file of the table (e.g. employees.data): parameters are rows of the table
+-R, --rate=      : open loop, queries offered per second
+-A, --arrival=   : arrival process in open loop ('constant' or 'poisson')
+-c, --clients=   : number of client processes (open loop, or concurrent queries if > 1)
+-b, --bucket=    : seconds per bucket of the throughput series (default 0.1)
+-D, --driver=    : database driver ('ibm_db' or 'sqlite', default DRIVER of ../db2.py)
+-f, --fetch=     : consumption of the result sets ('row', 'block', 'skip' or 'count')
+-n, --fetchsize= : number of rows per fetch (sets -f block)
 Executes reads against the database described in ../db2.py and prints timing 
 
 The default values are:
@@ -195,31 +274,86 @@ The default values are:
 -m 1000000              # Nb of potential employees tuple
 -s 'employeesspec'      # Employees table
 -k 1                    # 1 key in Employees table
+-f row                  # result sets fetched one row (tuple) at a time
+-n 100                  # rows per fetch in block mode
 
 Example: python reads.py -r1 -q1000 -p./query_point.sql -a0
          python reads.py -r5 -q100 -p./query_multipoint.sql -a5
          python reads.py -r10 -q1 -p./query_scan.sql 
          python reads.py -r1 -q5 -p./query_range.sql
+         python reads.py -r1 -q1000 -p./query_point.sql -a0 -Lemployees.data
+         python reads.py -r1 -q900 -p./query_point.sql -a0 -R200 -Apoisson -c8
+         python reads.py -r5 -q900 -p./query_multipoint.sql -a5 -c16
 
-'''
+With -R rate, the queries are an open loop: they arrive at rate per
+second (evenly spaced, or as a Poisson process with -A poisson) and
+are executed by -c client processes connected before the runs,
+whether they keep up or not. The latency of the queries of all the
+runs is summarized after the timings; it runs from the arrival of
+a query, and so includes the time it waited for a client.
+
+Without -R, -c N (N > 1) runs the queries concurrently: N client
+processes, connected with the query prepared before the runs, each
+execute queries as fast as they can, with the parameters they pull
+from a shared queue (in units of 100, generated as they are used).
+The number of queries per second of each run (all the clients) is
+printed after its timing (name_qps:=:value).
+
+The parameters of the queries are generated as they are used, so that
+a run may have millions of queries (e.g. point queries long enough for
+stable numbers); each run has the same queries. Nothing is printed per
+query: the number of rows of the result sets of each run (queries,
+rows, mean, min and max) is printed after the throughput series.
+Only the columns of the -a options are generated, 10000 queries at a
+time, within the timed runs: about 3 us per query for a key column
+(e.g. -a0 of employeesspec, a lookup in a permutation), less than 1 us
+for a column drawn with replacement (e.g. -a5), and about 5 us to
+read a row of the load file with -L. The timings of the runs include
+it, the latencies of the queries do not.
+
+The execution of each query, the fetch of its result set, and the
+query as a whole are timed; their latencies over all the runs are
+summarized after the timings (mean, p50, p95, p99 and max, in
+seconds), and per client with several clients. The queries completed are also counted in buckets of
+-b seconds, and a throughput series is printed for each run (the
+first and last buckets of a run are partial).
+
+By default, the rows of each result set are fetched one at a time, a
+Python call and a tuple per row, which for large result sets (e.g.
+query_scan.sql) measures the client more than the access path. The
+client overhead decreases with -f:
+- block: rows are fetched -n at a time (SQLite fetches them in one call;
+  DB2 already sends them in blocks, the calls are only grouped).
+- skip: the cursor advances over the rows (fetch_row) without building
+  them (with DB2; SQLite builds them anyway).
+- count: the query is wrapped in select count(*) from (query), and the
+  server returns only the number of rows.
+python reads.py -r5 -q1 -p./query_scan.sql -fcount
+python reads.py -r5 -q1 -p./query_scan.sql -n1000
 
-class Usage(Exception):
-    def __init__(self, msg):
-        self.msg = msg
+With -D sqlite (or DRIVER = 'sqlite' in ../db2.py), the queries run on a
+local SQLite database instead of DB2, prepared with runsql.py:
+python gentable.py 100000 employees.data employeesspec 1
+python runsql.py -D sqlite init.sql load.sql index_NC.sql
+python reads.py -D sqlite -r1 -q100 -p./query_multipoint.sql -a5
+
+'''
 
 def main(argv=None):
     global NBRUNS, NBQUERIES
-    global NBTUPLES, SPECFILE, NBKEYS, ATTLIST
+    global NBTUPLES, SPECFILE, NBKEYS, ATTLIST, SEED, LOADFILE
+    global RATE, ARRIVAL, NBCLIENTS, BUCKET, DRIVER, FETCH, FETCHSIZE, p, arrival_random, measures
     global QUERY_FILE_PATH, query_str
-    global g
+    global g, db
 
     try:
         if argv is None:
             argv = sys.argv
         try:
              opts, args = getopt.getopt(argv[1:], 
-              "hvr:q:p:s:k:m:a:", 
-             ["help", "runs=", "queries=", "path=", "specfile=", "numkeys=", "numtuples=", "attribute="])
+              "hvr:q:p:s:k:m:a:S:L:R:A:c:b:D:f:n:", 
+             ["help", "runs=", "queries=", "path=", "specfile=", "numkeys=", "numtuples=", "attribute=", "seed=",
+              "loadfile=", "rate=", "arrival=", "clients=", "bucket=", "driver=", "fetch=", "fetchsize="])
         except getopt.error, msg:
             raise Usage(msg)
     
@@ -236,7 +370,7 @@ def main(argv=None):
                     NBRUNS = v
                 if option in ("-q", "--queries"):
                     v = int(value)
-                    if not (v < 1000): raise Usage("NbQueries out of bounds")
+                    if (v < 1): raise Usage("NbQueries out of bounds")
                     NBQUERIES = v
                 if option in ("-p", "--path"):
                     if not os.path.exists(value): raise Usage("Query file path does not exist")
@@ -253,6 +387,37 @@ def main(argv=None):
                 if option in ("-a","--attribute"):
                     v = int(value)
                     ATTLIST.append(v)
+                if option in ("-S","--seed"):
+                    SEED = int(value)
+                if option in ("-L","--loadfile"):
+                    if not os.path.exists(value): raise Usage("Load file does not exist")
+                    LOADFILE = value
+                if option in ("-R","--rate"):
+                    v = float(value)
+                    if (v <= 0): raise Usage("Rate out of bounds")
+                    RATE = v
+                if option in ("-A","--arrival"):
+                    if not value in openloop.ARRIVALS: raise Usage("Arrival process not supported (constant or poisson)")
+                    ARRIVAL = value
+                if option in ("-c","--clients"):
+                    v = int(value)
+                    if (v < 1 or v > 60): raise Usage("Clients out of bounds")
+                    NBCLIENTS = v
+                if option in ("-b","--bucket"):
+                    v = float(value)
+                    if (v <= 0): raise Usage("Bucket out of bounds")
+                    BUCKET = v
+                if option in ("-D","--driver"):
+                    if not value in driver.DRIVERS: raise Usage("Driver not supported (ibm_db or sqlite)")
+                    DRIVER = value
+                if option in ("-f","--fetch"):
+                    if not value in ['row', 'block', 'skip', 'count']: raise Usage("Fetch mode not supported (row, block, skip or count)")
+                    FETCH = value
+                if option in ("-n","--fetchsize"):
+                    v = int(value)
+                    if (v < 1): raise Usage("Fetch size out of bounds")
+                    FETCHSIZE = v
+                    FETCH = 'block'
                 
         except ValueError, e:
             raise Usage("Invalid parameter:" + e)
@@ -268,10 +433,27 @@ def main(argv=None):
             raise Usage("Failed to open sql file.\n")
         
         if (query_str == None): raise Usage("Failed to read from SQL file")         
+        if FETCH == 'count':
+            query_str = counted(query_str)
         
-        g = GenWrites(NBTUPLES, NBKEYS, NBQUERIES, SPECFILE)
+        db = driver.load(DRIVER)
+        # queries may repeat parameters: there may be more queries than rows
+        g = GenWrites(NBTUPLES, NBKEYS, NBQUERIES, SPECFILE, SEED, loadfile=LOADFILE, distinct=False,
+                      attributes=ATTLIST)
+        measures = pool.Measures(BUCKET)
     
-        print ('run (query:'+ QUERY_FILE_PATH +')')
+        fetchmode = FETCH
+        if (FETCH == 'block'): fetchmode += ' ('+str(FETCHSIZE)+' rows)'
+        if RATE > 0:
+            print ('run (query:'+ QUERY_FILE_PATH +', fetch: '+fetchmode+', rate: '+str(RATE)+' '+ARRIVAL+', clients: '+str(NBCLIENTS)+')')
+            # arrivals of the open loop follow the seed, like the parameters
+            arrival_random = random.Random(SEED)
+            p = startclients(query_str)
+        elif NBCLIENTS > 1:
+            print ('run (query:'+ QUERY_FILE_PATH +', fetch: '+fetchmode+', clients: '+str(NBCLIENTS)+')')
+            p = startclients(query_str)
+        else:
+            print ('run (query:'+ QUERY_FILE_PATH +', fetch: '+fetchmode+')')
 
         # Timed experiment 
         t = timeit.Timer("experiment(query_str,g)", "from __main__ import experiment, query_str,g")
@@ -284,10 +466,25 @@ def main(argv=None):
                 s = str(timing)
                 outputKey = re.search('(?<=./)\w+(?=.sql)',QUERY_FILE_PATH)
                 if (outputKey == None):
-                    print QUERY_FILE_PATH + ':=:' + s 
+                    key = QUERY_FILE_PATH
                 else:
-                    print outputKey.group(0) + ':=:' + s 
+                    key = outputKey.group(0)
+                print key + ':=:' + s 
+                if NBCLIENTS > 1 and RATE == 0:
+                    print key + '_qps:=:' + str(NBQUERIES/timing)
+            if p is not None:
+                p.close()
+                p.join()
+            if RATE > 0:
+                print openloop.summary(times, RATE)
+            for line in histogram.report(latencies):
+                print line
+            for line in throughput.report(series, 'queries'):
+                print line
+            for r, n in enumerate(fetched):
+                print resultsets(r+1, n)
         except:
+            if p is not None: p.terminate()
             raise Usage(t.print_exc())
             
     except Usage, err:
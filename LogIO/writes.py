@@ -16,214 +16,247 @@ import sys
 import getopt
 import timeit
 import multiprocessing
+import multiprocessing.util
 import random
 import os
 import re
-import ibm_db
 import time
-from string import maketrans
+from itertools import islice
 
 ### Experiment parameters (default values)
 NBRUNS         = 5    # Number of runs
 NBTHREADS      = 10   # Number of threads 
 ISOL_LEVEL     = 'RR'
 WRITE_MODE     = 'insertN' # Write mode (insert or update)
-TRANS_MODE     = '1'      # Transaction mode (1 or N) 
+TRANS_MODE     = '1'      # Transaction mode (1, N, K or T) 
+COMMITROWS     = 100    # Number of writes per transaction (TRANS_MODE K)
+COMMITINTERVAL = 0.1    # Seconds between commits (TRANS_MODE T)
 NBWRITES       = 1000
 NBTUPLES       = 1000000
 SPECFILE       = 'accountspec'
 NBKEYS         = 1
+SEED           = None   # Seed of the generated parameters (None: random)
+MANIFEST       = None   # Manifest of the loaded table (None: writes follow SPECFILE)
+LOADFILE       = None   # Load file of the table (None: writes follow SPECFILE)
 ATTLIST        = []
 TL             = False
 TLSTMT         = "LOCK TABLE accounts in exclusive mode"
+WARMUP         = 0      # Number of untimed runs before the timed runs
+BATCHSIZE      = 1      # Number of rows sent per execution (1: one row at a time)
+UNITSIZE       = 0      # Number of writes pulled at a time from the work queue (0: static split)
+QUEUESIZE      = 0      # Number of units the work queue holds (0: 2 per thread)
+RATE           = 0      # Writes per second offered in open loop (0: closed loop)
+ARRIVAL        = 'constant' # Arrival process in open loop (constant or poisson)
+BUCKET         = 0.1    # Seconds per bucket of the throughput series
 
 ### Database parameters (DATABASE; HOSTNAME; PORT; USERNAME; PASSWORD)
 sys.path.append("..")
 from db2 import *
+from datagen import GenWrites, Usage
+import driver
+DRIVER = driver.configured()
+from bench import openloop, histogram, throughput, pool
 
-# Process Manager data structure
-q = None
+# Database driver (ibm_db or sqlite), set before the workers start
+db = None
+
+# Process pool, kept for the whole session
+p = None
 g = None
+w = None    # writes of the current run
+work = None # bounded queue of units of writes, with UNITSIZE (of requests, with RATE)
+times = []  # (arrival, begin, end) of the requests of the timed runs, with RATE
+latencies = {}  # {worker: {statement type: histogram}} of the timed runs
+series = []     # (start, {worker: throughput series}) of each timed run
+arrival_random = None
+
+# Connection and prepared statement of a worker process, kept for the whole session
+conn = None
+write_stmt = None
+measures = None # latencies and throughput series of the current task of a worker
+locked = False  # table lock taken by the current transaction of a worker (-l)
 
-""""
-Write threads for updateN and insertN
 """
-def write(q,data):
-    # initialize vars
-    write_str  = q
+Worker processes: connect once, then execute the writes of every run
+"""
+def connect(write_str):
+    global conn, write_stmt, measures
     # Connect to DB
-    conn = ibm_db.pconnect(DATABASE, USERNAME, PASSWORD)
-    if conn is None: raise Usage(ibm_db.conn_errormsg())
-    ibm_db.autocommit(conn, ibm_db.SQL_AUTOCOMMIT_OFF)
+    conn = db.pconnect(DATABASE, USERNAME, PASSWORD)
+    if conn is None: raise Usage(db.conn_errormsg())
+    db.autocommit(conn, db.SQL_AUTOCOMMIT_OFF)
     # Set isolation level
-    ret = ibm_db.exec_immediate(conn, "SET CURRENT ISOLATION = "+ISOL_LEVEL)
-    if TL:
-        ret = ibm_db.exec_immediate(conn, TLSTMT)
+    ret = db.exec_immediate(conn, "SET CURRENT ISOLATION = "+ISOL_LEVEL)
     # Prepare Statements
-    write_stmt = ibm_db.prepare(conn, write_str)
+    write_stmt = db.prepare(conn, write_str)
     if (write_stmt == False): raise Usage("Failed to prepare write statement")
+    measures = pool.Measures(BUCKET)
+    # Disconnect when the worker exits, at the end of the session
+    multiprocessing.util.Finalize(None, disconnect, exitpriority=10)
+
+def disconnect():
+    status = db.close(conn)
+    if status == False: raise Usage("Failed to close db connection.\n") 
+
+def lock():
+    # with -l, the first write of each transaction locks the table, until
+    # the commit (a lock taken once at connection would block the other
+    # workers from the start)
+    global locked
+    if TL and not locked:
+        if db.exec_immediate(conn, TLSTMT) == False: raise Usage("Failed to lock the table")
+        locked = True
+
+def commit():
+    global locked
+    begin = histogram.clock()
+    db.commit(conn)
+    locked = False
+    return histogram.record(measures.latency, 'commit', begin)
+
+"""
+Write threads for updateN and insertN
+"""
+def generator():
+    # the stream of the writes of the session: in updateN mode, tuples of
+    # the -a columns, in the order of the options (that of the parameters
+    # of the statement)
+    attributes = None
+    if (WRITE_MODE == 'updateN'): attributes = ATTLIST
+    return GenWrites(NBTUPLES, NBKEYS, NBWRITES*(WARMUP+NBRUNS), SPECFILE, SEED,
+                     MANIFEST, 'insert' if WRITE_MODE == 'insertN' else 'update', LOADFILE,
+                     attributes=attributes)
+
+def commitpoint(pending, last):
+    # commits the pending writes if the transaction mode says so (N: after
+    # each write, K: every COMMITROWS writes, T: every COMMITINTERVAL
+    # seconds); returns the writes still pending and the last commit time
+    if ((TRANS_MODE == 'N') or
+        (TRANS_MODE == 'K' and pending >= COMMITROWS) or
+        (TRANS_MODE == 'T' and time.time() - last >= COMMITINTERVAL)):
+        return 0, commit()
+    return pending, last
+
+def write(data):
     # Perform insertions/updates
+    if BATCHSIZE > 1:
+        return writebatches(data)
+    pending, last = 0, time.time()
     for t in data:
-        # execute insertN statement
-        if (WRITE_MODE == 'insertN'):
-            if ibm_db.execute(write_stmt, t) == False:
-                raise Usage("Failed to execute insertN statement")
-        elif (WRITE_MODE == 'updateN'):
-            l = list(t)
-            u = [l[j] for j in range(len(l)) if j in ATTLIST]
-            if ibm_db.execute(write_stmt, tuple(u)) == False:
-                raise Usage("Failed to execute updateN statement")              
-        if (TRANS_MODE == 'N'): 
-            ibm_db.commit(conn)
-    # commit if TRANS_MODE == 1
-    ibm_db.commit(conn)
-    # Disconnect from DB
-    status = ibm_db.close(conn)
-    if status == False: raise Usage("Failed to close db connection.\n") 
+        # execute insertN/updateN statement
+        lock()
+        begin = histogram.clock()
+        if db.execute(write_stmt, t) == False:
+            raise Usage("Failed to execute "+WRITE_MODE+" statement")
+        measures.completed.record(histogram.record(measures.latency, WRITE_MODE, begin))
+        pending, last = commitpoint(pending+1, last)
+    # commit if TRANS_MODE == 1 (and the last writes otherwise)
+    commit()
+    return measures.collected()
 
+def writebatches(data):
+    # Same as write, BATCHSIZE rows per execution (array binding); commit
+    # points are checked after each batch
+    pending, last = 0, time.time()
+    data = iter(data)
+    batch = list(islice(data, BATCHSIZE))
+    while batch:
+        rows = tuple(batch)
+        lock()
+        begin = histogram.clock()
+        n = db.execute_many(write_stmt, rows)
+        if n is None or n is False:
+            raise Usage("Failed to execute "+WRITE_MODE+" batch")
+        measures.completed.record(histogram.record(measures.latency, WRITE_MODE+' batch', begin), len(batch))
+        pending, last = commitpoint(pending+len(batch), last)
+        batch = list(islice(data, BATCHSIZE))
+    # commit if TRANS_MODE == 1 (and the last writes otherwise)
+    commit()
+    return measures.collected()
 
-def update1(q):
-    write_str = q[0]
-    # Connect to DB
-    conn = ibm_db.pconnect(DATABASE, USERNAME, PASSWORD)
-    if conn is None: raise Usage(ibm_db.conn_errormsg())
-    ibm_db.autocommit(conn, ibm_db.SQL_AUTOCOMMIT_OFF)
-    # Set isolation level
-    ret = ibm_db.exec_immediate(conn, "SET CURRENT ISOLATION = "+ISOL_LEVEL)
-    if TL:
-        ret = ibm_db.exec_immediate(conn, TLSTMT)
-    # Prepare statement
-    write_stmt   = ibm_db.prepare(conn, write_str)
-    if (write_stmt == False): raise Usage("Failed to prepare sum query")
+
+def update1():
     # Execute statement
-    if ibm_db.execute(write_stmt) == False:
+    lock()
+    begin = histogram.clock()
+    if db.execute(write_stmt) == False:
         raise Usage("Failed to execute the sum query")
-    ibm_db.commit(conn)
-    # Disconnect from DB
-    status = ibm_db.close(conn)
-    if status == False: raise Usage("Failed to close db connection.\n") 
+    measures.completed.record(histogram.record(measures.latency, WRITE_MODE, begin))
+    commit()
+    return measures.collected()
+
+
+def pulled():
+    # the writes pulled from the work queue, one unit at a time, until
+    # the end of the run (None)
+    while True:
+        unit = work.get()
+        if unit is None:
+            return
+        for t in unit:
+            yield t
+
+def consume(i):
+    # a worker writes the units it pulls: one transaction with -x 1
+    return write(pulled())
+
+def writeone(t):
+    # one request of the open loop: a transaction of one write
+    lock()
+    begin = histogram.clock()
+    if db.execute(write_stmt, t) == False:
+        raise Usage("Failed to execute "+WRITE_MODE+" statement")
+    measures.completed.record(histogram.record(measures.latency, WRITE_MODE, begin))
+    commit()
+
+def serve(i):
+    return openloop.serve(work, writeone), measures.collected()
 
-"""
-Gentable class
-"""
-class GenWrites(object):
-    def __init__(self, numrows, numkeys, numwrites, specfile):
-        self.numrows   = numrows
-        self.numkeys   = numkeys
-        self.numwrites = numwrites
-        # Extract columns specifications from specfile
-        print "reading specfile..."
-        f = open(specfile)
-        filelines = f.readlines()
-        alllines = [(l.strip()).translate(maketrans("",""),"\n") for l in filelines if len(l.translate(maketrans("",""),"\n")) >1] # remove empty lines
-        lines = [ll for ll in [l for l in alllines if l[0]!='/'] if ll[0]!=' ']   # remove comments
-        colspecs = [l.split(' ') for l in lines]
-        numcols = len(colspecs) 
-        # Generate Table based on columns specifications
-        print "generating rows..."
-        self.writes = self.gentable(numcols, colspecs)
-        self.counter = 0
-        
-    def getWrite(self,cursor):
-        if cursor < 0: return None
-        elif cursor >= len(self.writes) : return None
-        else:
-            return self.writes[cursor]
-                   
-    def getWrites(self,count):
-        s = self.counter
-        self.counter += count
-        return [self.getWrite(c) for c in range(s,s+count)]
-        
-    def sample_wr(self,population, k):
-        # Chooses k random elements (with replacement) from a population
-        n = len(population)
-        _random, _int = random.random, int  # speed hack 
-        result = [None] * k
-        for i in xrange(k):
-            j = _int(_random() * n)
-            result[i] = population[j]
-        return result
-
-    def gentable(self,numcols, colspecs):
-        attvalues     = [[]]*numcols
-        schema   = [[]]*numcols
-        i = 0
-        while i < numcols:
-            # spec is of the form -- attribute draw basevalue distribution
-            # for now we ignore distribution
-            spec = colspecs[i]
-            attribute = spec[0]
-            draw = float(spec[1])
-            basevalue = 0
-            if len(spec)>2:
-                basevalue = int(spec[2])
-            # generate the numbers used to generate attribute values
-            if draw == 1:
-                numlist = random.sample(range(self.numrows),self.numwrites)
-            # for now we assume uniform distribution        
-            elif draw < 1:
-                numvalues = int(round(self.numrows*draw, 0))
-                numlist   = self.sample_wr(range(numvalues), self.numwrites)
-            elif draw > 1:
-                numvalues = int(round(draw, 0))
-                if numvalues >= self.numwrites:
-                    numlist = random.sample(range(numvalues),self.numwrites)
-                else:
-                    numlist = self.sample_wr(range(numvalues),self.numwrites)
-            # adjust list of numbers to account for basevalue   
-            numlist = [num+basevalue for num in numlist]        
-            # distinction between numerical attributes 'n' and alphanumerical attributes ATT_NAME
-            if attribute == 'n':
-                att = ''
-                s = 'numeric'
-                attvalues[i] = [num for num in numlist] 
-            else:
-                att = attribute
-                s = 'varchar('+str(max(numlist))+')'   
-                attvalues[i] = [att+str(num) for num in numlist]    
-            # record schema
-            schema[i] = s
-            i += 1
-        # remove duplicates for the key values
-        if self.numkeys == numcols:
-            # - use sets to eliminate duplicates
-            tuples = zip(*attvalues)
-            writes = set(tuples)
-        elif self.numkeys < numcols:
-            # - use dictionary to eliminate duplicates
-            keys = zip(*attvalues[:self.numkeys])
-            rest = zip(*attvalues[self.numkeys:])
-            dico = dict(zip(keys,rest))
-            writes = set([k+v for k,v in dico.items()])
-        else:
-            print "error in specfile: numkeys > numcols\n"
-            system.exit(2)
-        print "done generating rows..."
-        return list(writes)
-           
 
-   
+def collect(results):
+    # merges the measures returned by the tasks of the current run, per
+    # worker
+    pool.collect(results, latencies, series[-1][1])
+
 def chunks(l, n):
     return [l[i:i+n] for i in range(0, len(l), n) ]   
     
-def lw(z):
-    pass 
-    
-def experiment(q,g):
-    global lw
-    def lw(z):
-        write(q[0],z)
-        return 0
+def startpool(write_str):
+    # Starts the worker processes, and waits until each of them is
+    # connected with its statement prepared (outside of the timed runs)
+    global work
+    if RATE > 0:
+        # open loop: the queue is not bounded, requests wait for a worker
+        work = multiprocessing.Queue()
+    elif UNITSIZE > 0:
+        work = multiprocessing.Queue(QUEUESIZE or 2*NBTHREADS)
+    return pool.start(NBTHREADS, connect, (write_str,))
+
+def experiment(p,w):
+    series.append((time.time(), {}))
     # Launch update1 statement
     if (WRITE_MODE == 'update1'):
-        update1(q)
+        collect([p.apply(update1)])
+    elif RATE > 0:
+        # Writes arrive at RATE per second, whether workers keep up or not
+        r = p.map_async(serve, range(NBTHREADS), 1)
+        openloop.dispatch(work, w, openloop.arrivals(RATE, len(w), ARRIVAL, arrival_random), NBTHREADS)
+        for l, c in r.get():
+            times.extend(l)
+            collect([c])
+    elif UNITSIZE > 0:
+        # Workers pull units of writes as they go; put blocks while the
+        # queue is full, so that the units are produced as they are used
+        r = p.map_async(consume, range(NBTHREADS), 1)
+        for unit in chunks(w, UNITSIZE):
+            work.put(unit)
+        for i in range(NBTHREADS):
+            work.put(None)
+        collect(r.get())
     else:
         # Launch write threads
-        c = chunks(g.getWrites(NBWRITES), NBWRITES/NBTHREADS)
-        p = multiprocessing.Pool(NBTHREADS)
-        p.map(lw,c)
-        p.close()
+        c = chunks(w, NBWRITES/NBTHREADS)
+        collect(p.map(write,c))
     
 help_message = '''
 python writes.py [options]
@@ -234,40 +267,64 @@ options:
 -r, --runs=      : number of repetitions (< 100)
 -i, --isol=      : isolation level ('UR', 'CS', 'RS','RR')
 -w, --write=     : write mode ('insertN', 'update1', 'updateN')
--x, --trans=     : transaction mode (writes grouped in '1' or 'N' transactions)
+-x, --trans=     : transaction mode (writes grouped in '1' or 'N' transactions, 'K': every -c writes, 'T': every -T seconds)
+-c, --commitrows=     : number of writes per transaction (sets -x K)
+-T, --commitinterval= : seconds between commits (sets -x T)
 -s, --specfile=  : specification file (gentable format)
 -k, --numkeys=   : number of keys in specification file
 -m, --numtuples= : max number of tuples in specification file (should be greater than -n)
 -a, --attribute= : position of the attribute referenced in update file (multiple -a considered in order)
+-S, --seed=      : seed (integer) making the generated parameters reproducible
+-M, --manifest=  : manifest of the loaded table (gentable -S): insertN writes new rows, updates existing keys
+-L, --loadfile=  : load file of the table (e.g. accounts.data): updates use the keys of its rows
 -l, --tablelock  : uses a table lock for insertion/update
-Executes writes against the database described in ../db2.py and prints timing 
+-W, --warmup=    : number of untimed runs before the timed runs
+-B, --batch=     : number of rows sent per execution (array insert/update, in insertN/updateN modes)
+-u, --unit=      : workers pull units of this number of writes from a work queue (0: static split)
+-Q, --queuesize= : number of units the work queue holds (default 2 per thread)
+-R, --rate=      : open loop, writes offered per second, each a transaction (not with -x, -c, -T, -B, -u, -Q)
+-A, --arrival=   : arrival process in open loop ('constant' or 'poisson')
+-b, --bucket=    : seconds per bucket of the throughput series
+-D, --driver=    : database driver ('ibm_db' or 'sqlite', default DRIVER of ../db2.py)
+Executes writes against the database described in ../db2.py and prints timing,
+then the latencies of the statements and the throughput series of each run
 
 Default values:
 -t 10   # Number of threads 
 -r 5    # Number of runs
 -i 'RR'
 -w 'insertN' # Write mode (insert or update)
--x '1'      # Transaction mode (1 or N) 
+-x '1'      # Transaction mode (1, N, K or T) 
+-c 100      # writes per transaction in mode K
+-T 0.1      # seconds between commits in mode T
 -n 1000
 -m 1000000
 -s 'accountspec'
 -k 1
+-W 0
+-B 1    # one row per execution
+-u 0    # writes split in one chunk per thread
+-b 0.1  # throughput buckets of 100 ms
 by default table lock is not activated. The table lock statement is:
 TLSTMT = "LOCK TABLE accounts in exclusive mode"
 
 
 Examples: 
 python writes.py -t1 -r1 -iRR -wupdateN -xN -n1000 -a2 -a0
+python writes.py -t10 -r5 -c1000
+python writes.py -t10 -r1 -n10000 -R500 -Apoisson
+On a local SQLite database, prepared with runsql.py:
+python gentable.py -S1 1000000 accounts.data accountspec 1
+python runsql.py -D sqlite init.sql load.sql
+python writes.py -D sqlite -t4 -r1 -wupdateN -xN -M accounts.data.manifest -a2 -a0
 '''
 
-class Usage(Exception):
-    def __init__(self, msg):
-        self.msg = msg
-
 def main(argv=None):
     global NBRUNS, NBTHREADS, ISOL_LEVEL, WRITE_MODE, TRANS_MODE
-    global NBWRITES, NBTUPLES, SPECFILE, NBKEYS, ATTLIST
-    global q, g
+    global NBWRITES, NBTUPLES, SPECFILE, NBKEYS, ATTLIST, SEED, MANIFEST, LOADFILE
+    global TL, WARMUP, BATCHSIZE, COMMITROWS, COMMITINTERVAL, UNITSIZE, QUEUESIZE
+    global RATE, ARRIVAL, BUCKET, DRIVER, arrival_random, times
+    global p, g, w, db
 
     # Initialize variables
     n = 0
@@ -280,9 +337,11 @@ def main(argv=None):
 
         try:
             opts, args = getopt.getopt(argv[1:], 
-              "hvr:t:i:w:x:n:s:k:m:a:l", 
+              "hvr:t:i:w:x:n:s:k:m:a:lS:M:L:W:B:c:T:u:Q:R:A:b:D:", 
               ["help", "runs=","threads=", "isol=", "write=", "trans=", "n=", 
-              "specfile=", "numkeys=", "numtuples=", "attribute=", "tablelock"])
+              "specfile=", "numkeys=", "numtuples=", "attribute=", "tablelock", "seed=", "manifest=",
+              "loadfile=", "warmup=", "batch=", "commitrows=", "commitinterval=",
+              "unit=", "queuesize=", "rate=", "arrival=", "bucket=", "driver="])
         except getopt.error, msg:
             raise Usage(msg)
     
@@ -307,8 +366,18 @@ def main(argv=None):
                 if not value in ['insertN', 'update1', 'updateN']: raise Usage("Write mode not supported (insertN, update1 or updateN)")
                 WRITE_MODE = value
             if option in ("-x", "--trans"):
-                if not value in ['1', 'N']: raise Usage("Transaction mode not supported (1 or N)")
+                if not value in ['1', 'N', 'K', 'T']: raise Usage("Transaction mode not supported (1, N, K or T)")
                 TRANS_MODE = value
+            if option in ("-c", "--commitrows"):
+                v = int(value)
+                if (v < 1): raise Usage("Writes per transaction out of bounds")
+                COMMITROWS = v
+                TRANS_MODE = 'K'
+            if option in ("-T", "--commitinterval"):
+                v = float(value)
+                if (v <= 0): raise Usage("Commit interval out of bounds")
+                COMMITINTERVAL = v
+                TRANS_MODE = 'T'
             if option in ("-n", "--n"): 
                 v = int(value)
                 if (n < 0 or n>1000000): raise Usage("N out of bounds")
@@ -327,8 +396,57 @@ def main(argv=None):
                 ATTLIST.append(v)
             if option in ("-l","--tablelock"):
                 TL=True
+            if option in ("-S","--seed"):
+                SEED = int(value)
+            if option in ("-M","--manifest"):
+                if not os.path.exists(value): raise Usage("Manifest does not exist")
+                MANIFEST = value
+            if option in ("-L","--loadfile"):
+                if not os.path.exists(value): raise Usage("Load file does not exist")
+                LOADFILE = value
+            if option in ("-W","--warmup"):
+                v = int(value)
+                if not (0 <= v < 100): raise Usage("Warmup runs out of bounds")
+                WARMUP = v
+            if option in ("-B","--batch"):
+                v = int(value)
+                if (v < 1): raise Usage("Batch size out of bounds")
+                BATCHSIZE = v
+            if option in ("-u","--unit"):
+                v = int(value)
+                if (v < 0): raise Usage("Unit size out of bounds")
+                UNITSIZE = v
+            if option in ("-Q","--queuesize"):
+                v = int(value)
+                if (v < 1): raise Usage("Queue size out of bounds")
+                QUEUESIZE = v
+            if option in ("-R","--rate"):
+                v = float(value)
+                if (v <= 0): raise Usage("Rate out of bounds")
+                RATE = v
+            if option in ("-A","--arrival"):
+                if not value in openloop.ARRIVALS: raise Usage("Arrival process not supported (constant or poisson)")
+                ARRIVAL = value
+            if option in ("-b","--bucket"):
+                v = float(value)
+                if (v <= 0): raise Usage("Bucket out of bounds")
+                BUCKET = v
+            if option in ("-D","--driver"):
+                if not value in driver.DRIVERS: raise Usage("Driver not supported (ibm_db or sqlite)")
+                DRIVER = value
         # Verify preconditions: modes are compatible, required sql files exist
         if (WRITE_MODE == 'update1'): TRANS_MODE = '1'  
+        if (WRITE_MODE == 'insertN' and LOADFILE != None): raise Usage("The rows of a load file exist, they cannot be inserted (use -M)")
+        if (WRITE_MODE == 'update1' and RATE > 0): raise Usage("Open loop not supported in update1 mode")
+        if (RATE > 0):
+            # in open loop, each write is a transaction of its own
+            if [o for o, v in opts if o in ("-x", "--trans", "-c", "--commitrows", "-T", "--commitinterval",
+                                            "-B", "--batch", "-u", "--unit", "-Q", "--queuesize")]:
+                raise Usage("Transaction, batch and unit options do not apply in open loop (-R)")
+            TRANS_MODE = 'N'
+        db = driver.load(DRIVER)
+        # arrivals of the open loop follow the seed, like the writes
+        arrival_random = random.Random(SEED)
 
         write_str = None
         if (WRITE_MODE == 'insertN'):
@@ -354,27 +472,55 @@ def main(argv=None):
                 raise Usage("Failed to open updateN.sql.\n")
         if (write_str == None): raise Usage("Failed to read from SQL file") 
         
+        trans = TRANS_MODE
+        if (TRANS_MODE == 'K'): trans += ' ('+str(COMMITROWS)+' writes)'
+        if (TRANS_MODE == 'T'): trans += ' ('+str(COMMITINTERVAL)+' s)'
+        if (RATE > 0):
+            mode = ', trans_mode:'+trans+', rate: '+str(RATE)+' '+ARRIVAL
+        else:
+            mode = (', trans_mode:'+trans+', batch: '+str(BATCHSIZE)+
+                    ', unit: '+(str(UNITSIZE) if UNITSIZE > 0 else 'static'))
         print ('run (isol: '+ISOL_LEVEL+', threads: '+str(NBTHREADS)+', n: '+str(NBWRITES)+
-               ', write_mode:'+WRITE_MODE+', trans_mode:'+TRANS_MODE+')')
+               ', write_mode:'+WRITE_MODE+mode+')')
 
-        # Manager Initialization
-        g = GenWrites(NBTUPLES, NBKEYS, NBWRITES*NBRUNS, SPECFILE)
-        manager = multiprocessing.Manager()
-        q = manager.list([write_str])
+        # Pool Initialization
+        g = generator()
+        print "Connecting workers ..."
+        p = startpool(write_str)
         
         # Timed experiment 
         print "Starting experiment ..."
-        t = timeit.Timer("experiment(q,g)", "from __main__ import experiment,q,g")
+        t = timeit.Timer("experiment(p,w)", "from __main__ import experiment,p,w")
         timings = []
         try:
+            # warm-up runs, not timed
+            for run in range(WARMUP):
+                if (WRITE_MODE != 'update1'): w = list(islice(g, NBWRITES))
+                experiment(p,w)
+            del times[:]
+            latencies.clear()
+            del series[:]
             # repeat 1 experiment NBRUNS time - output is a list of timing
-            timings = t.repeat(NBRUNS,1)  
+            # (the writes of each run are generated before it is timed)
+            for run in range(NBRUNS):
+                if (WRITE_MODE != 'update1'): w = list(islice(g, NBWRITES))
+                timings.append(t.timeit(1))
+            # workers disconnect as they exit
+            p.close()
+            p.join()
             print "Done."  
             # Log timing
             for timing in timings:
                 s = str(timing)
                 print s 
+            if RATE > 0:
+                print openloop.summary(times, RATE)
+            for line in histogram.report(latencies):
+                print line
+            for line in throughput.report(series, 'writes'):
+                print line
         except:
+            p.terminate()
             raise Usage(t.print_exc())      
 
     except Usage, err:
@@ -0,0 +1,15 @@
+# encoding: utf-8
+"""
+bench
+
+Measurement shared by the experiment harnesses (LogIO/writes.py,
+Indexing/reads.py, Assignment1/ValueOfSerializability/sumNswap.py):
+- openloop: open-loop load generation at a target arrival rate, with
+  the latency of each request.
+- histogram: latency histograms of the statements, per statement type
+  and per worker.
+- throughput: operations completed in fixed time buckets, per worker
+  and per run.
+- pool: worker processes started once for the session, and the merge
+  of the measures they return, per worker.
+"""
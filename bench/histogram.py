@@ -0,0 +1,129 @@
+# encoding: utf-8
+"""
+bench/histogram.py
+
+Latency histograms of the statements executed by the harnesses, in the
+manner of HdrHistogram: each latency is counted, in microseconds, in a
+bucket whose width is less than 1% of its value (exact below 256 us),
+so that a histogram takes a few KB whatever the number of statements,
+and the histograms of several workers, or several runs, merge by
+adding their counts. Percentiles are reported as the highest value of
+their bucket, the maximum exactly.
+
+A worker keeps one histogram per statement type (e.g. {'insertN': h,
+'commit': h}), records the time of each execution with
+
+begin = clock()
+db.execute(stmt, params)
+record(latency, 'insertN', begin)
+
+and returns them to the main process (histograms pickle), which
+reports them per statement type and per worker.
+"""
+
+import math
+import time
+
+SUBBITS = 7              # 2**SUBBITS buckets per power of 2 (precision < 1%)
+SUBCOUNT = 1 << SUBBITS
+PERCENTILES = [50, 95, 99]
+
+# clock of the latencies (seconds): gettimeofday, a few hundred ns per call
+clock = time.time
+
+
+def bucket(v):
+    # bucket of v microseconds: v itself below 2*SUBCOUNT, then SUBCOUNT
+    # buckets per power of 2
+    if v < 2*SUBCOUNT:
+        return v
+    shift = v.bit_length() - SUBBITS - 1
+    return SUBCOUNT*(shift+1) + (v >> shift) - SUBCOUNT
+
+def highest(i):
+    # highest value (microseconds) of bucket i
+    if i < 2*SUBCOUNT:
+        return i
+    shift = i/SUBCOUNT - 1
+    return ((i - SUBCOUNT*shift + 1) << shift) - 1
+
+
+class Histogram(object):
+    # Counts of latencies, by bucket
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0    # seconds
+        self.max = 0.0      # seconds
+
+    def record(self, seconds):
+        i = bucket(max(0, int(seconds*1e6)))
+        self.counts[i] = self.counts.get(i, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        # adds the latencies of other to self; returns self
+        for i, n in other.counts.iteritems():
+            self.counts[i] = self.counts.get(i, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, p):
+        # p-th percentile (0 < p <= 100), in seconds
+        if self.count == 0:
+            return 0.0
+        rank = max(1, int(math.ceil(p/100.0*self.count)))
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if seen >= rank:
+                return min(highest(i)/1e6, self.max)
+        return self.max
+
+    def summary(self):
+        # count, mean, percentiles and max, in seconds
+        if self.count == 0:
+            return "n 0"
+        return ("n %d, mean %.6f, " % (self.count, self.total/self.count) +
+                ", ".join(["p%d %.6f" % (p, self.percentile(p)) for p in PERCENTILES]) +
+                ", max %.6f" % self.max)
+
+
+def record(histograms, kind, begin):
+    # records the time elapsed since begin (clock()) in the histogram of
+    # statement type kind; returns the current time
+    end = clock()
+    h = histograms.get(kind)
+    if h is None:
+        h = histograms[kind] = Histogram()
+    h.record(end - begin)
+    return end
+
+def merge(into, histograms):
+    # adds histograms (by statement type) to into
+    for kind, h in histograms.iteritems():
+        if kind in into:
+            into[kind].merge(h)
+        else:
+            into[kind] = Histogram().merge(h)
+    return into
+
+def report(workers):
+    # lines describing the latencies of workers ({worker: {kind: histogram}}):
+    # per statement type over all workers, then per worker
+    total = {}
+    for name in workers:
+        merge(total, workers[name])
+    lines = []
+    for kind in sorted(total):
+        lines.append("latency (s) %s: %s" % (kind, total[kind].summary()))
+    if len(workers) > 1:
+        for name in sorted(workers):
+            for kind in sorted(workers[name]):
+                lines.append("  %s %s: %s" % (name, kind, workers[name][kind].summary()))
+    return lines
@@ -0,0 +1,79 @@
+# encoding: utf-8
+"""
+bench/openloop.py
+
+Open-loop load: requests arrive at a target rate whatever the time the
+previous ones take, as opposed to the closed loop of the harnesses where
+each worker issues its next statement when the previous one returns.
+The main process puts each request on a queue at its arrival time
+(dispatch), worker processes take them from the queue and execute them
+(serve). The latency of a request runs from its arrival time, so that it
+includes the time spent waiting in the queue for a worker; the service
+time runs from the moment a worker takes it.
+"""
+
+import math
+import time
+import random
+from itertools import izip
+
+ARRIVALS = ['constant', 'poisson']
+
+
+def arrivals(rate, n, process='constant', rng=None):
+    # arrival times of n requests at rate requests per second, in seconds
+    # from the start: evenly spaced, or separated by exponential gaps
+    # (generated as they are used)
+    if rng is None: rng = random
+    t = 0.0
+    for i in xrange(n):
+        if process == 'constant':
+            yield i/float(rate)
+        else:
+            yield t
+            t += rng.expovariate(rate)
+
+def dispatch(queue, requests, offsets, nbworkers):
+    # puts each request on queue at its arrival time, then one end marker
+    # per worker; returns the start time. Requests late because of the
+    # dispatcher itself are put at once, keeping their arrival time.
+    # requests and offsets may be generators.
+    start = time.time()
+    for offset, request in izip(offsets, requests):
+        delay = start + offset - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        queue.put((start + offset, request))
+    for i in range(nbworkers):
+        queue.put(None)
+    return start
+
+def serve(queue, execute):
+    # executes the requests taken from queue until an end marker; returns
+    # (arrival, begin, end) for each of them
+    times = []
+    while True:
+        r = queue.get()
+        if r is None:
+            return times
+        arrival, request = r
+        begin = time.time()
+        execute(request)
+        times.append((arrival, begin, time.time()))
+
+def percentile(values, p):
+    # p-th percentile (0 < p <= 100) of sorted values
+    return values[max(0, int(math.ceil(p/100.0*len(values)))-1)]
+
+def summary(times, rate):
+    # one line describing the requests of times, offered at rate
+    if not times:
+        return "latency: no request"
+    latencies = sorted([end-arrival for arrival, begin, end in times])
+    service = sum([end-begin for arrival, begin, end in times])/len(times)
+    elapsed = max([end for arrival, begin, end in times]) - min([arrival for arrival, begin, end in times])
+    return ("latency (s): requests %d, offered %.1f/s, achieved %.1f/s, mean %.6f, "
+            "p50 %.6f, p90 %.6f, p99 %.6f, max %.6f, service mean %.6f" %
+            (len(times), rate, len(times)/max(elapsed, 1e-9), sum(latencies)/len(latencies),
+             percentile(latencies, 50), percentile(latencies, 90), percentile(latencies, 99),
+             latencies[-1], service))
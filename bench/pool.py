@@ -0,0 +1,78 @@
+# encoding: utf-8
+"""
+bench/pool.py
+
+The worker processes of a harness, kept for the whole session, and the
+measures they return to the main process at the end of each task.
+
+start() starts the workers, and waits until each of them has run its
+initializer (e.g. connected, with its statements prepared), so that
+connections are not part of the timed runs. A worker records the
+latencies of its statements and the operations it completes in its
+Measures, and returns them at the end of a task with collected(); the
+main process merges them per worker with collect().
+"""
+
+import time
+import multiprocessing
+
+from datagen import Usage
+from bench import histogram, throughput
+
+
+def start(processes, initializer, initargs=(), what='worker'):
+    # a pool of processes, each of them initialized
+    ready = multiprocessing.Value('i', 0)
+    failed = multiprocessing.Value('i', 0)
+    pool = multiprocessing.Pool(processes, initialize, (initializer, initargs, ready, failed))
+    while ready.value < processes:
+        if failed.value > 0:
+            pool.terminate()
+            raise Usage("Failed to connect the "+what+" processes")
+        time.sleep(0.01)
+    return pool
+
+def initialize(initializer, initargs, ready, failed):
+    try:
+        initializer(*initargs)
+    except:
+        with failed.get_lock():
+            failed.value += 1
+        raise
+    with ready.get_lock():
+        ready.value += 1
+
+
+class Measures(object):
+    # What a worker measures during a task: the latencies of its
+    # statements ({statement type: histogram}) and the operations it
+    # completes in each bucket of bucket seconds
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.latency = {}
+        self.completed = throughput.Series(bucket)
+
+    def collected(self, *extra):
+        # the measures of the task (and extra), with the name of the
+        # worker; the next task starts afresh
+        result = (multiprocessing.current_process().name, self.latency, self.completed) + extra
+        self.latency = {}
+        self.completed = throughput.Series(self.bucket)
+        return result
+
+
+def collect(results, latencies, workers):
+    # merges the measures of results (returned by collected) per worker,
+    # the latencies into latencies ({worker: {statement type: histogram}})
+    # and the throughput series into workers ({worker: series}); returns
+    # the extras of each result
+    extras = []
+    for result in results:
+        name, l, s = result[:3]
+        histogram.merge(latencies.setdefault(name, {}), l)
+        if name in workers:
+            workers[name].merge(s)
+        else:
+            workers[name] = s
+        extras.append(result[3:])
+    return extras
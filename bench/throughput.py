@@ -0,0 +1,73 @@
+# encoding: utf-8
+"""
+bench/throughput.py
+
+Throughput over time within a run: each worker counts the operations
+it completes in fixed time buckets (0.1 s by default), and the main
+process adds the counts of the workers of a run into a series, so that
+ramp-up, checkpoints or log-full pauses show inside a run rather than
+in its elapsed time only.
+
+Buckets are counted from the epoch (bucket i covers [i*interval,
+(i+1)*interval)), so that workers need not know when the run started;
+the series of a run starts with the bucket of its start, which is
+therefore partial, as is its last bucket.
+
+A worker records the completion of each operation with
+
+completed.record(histogram.clock())
+
+and returns its series to the main process (series pickle).
+"""
+
+INTERVAL = 0.1      # Seconds per bucket
+
+
+class Series(object):
+    # Operations completed, by bucket
+    def __init__(self, interval=INTERVAL):
+        self.interval = interval
+        self.counts = {}
+
+    def record(self, t, n=1):
+        # n operations completed at time t (seconds since the epoch)
+        i = int(t/self.interval)
+        self.counts[i] = self.counts.get(i, 0) + n
+
+    def merge(self, other):
+        # adds the operations of other to self; returns self
+        for i, n in other.counts.iteritems():
+            self.counts[i] = self.counts.get(i, 0) + n
+        return self
+
+    def last(self):
+        # last bucket with an operation (-1 if none)
+        if not self.counts:
+            return -1
+        return max(self.counts)
+
+    def counts_from(self, first, last):
+        # operations of buckets first..last
+        return [self.counts.get(i, 0) for i in xrange(first, last+1)]
+
+
+def report(runs, unit='operations'):
+    # lines describing the throughput of runs, a list of (start, {worker:
+    # series}): per run, the operations of all the workers in each bucket
+    # from the start of the run, then those of each worker
+    lines = []
+    for r, (start, workers) in enumerate(runs):
+        if not workers:
+            continue
+        interval = workers.values()[0].interval
+        total = Series(interval)
+        for name in workers:
+            total.merge(workers[name])
+        first = int(start/interval)
+        last = max(first, total.last())
+        lines.append("throughput (%s per %g s) run %d: %s" %
+                     (unit, interval, r+1, " ".join(map(str, total.counts_from(first, last)))))
+        if len(workers) > 1:
+            for name in sorted(workers):
+                lines.append("  %s: %s" % (name, " ".join(map(str, workers[name].counts_from(first, last)))))
+    return lines
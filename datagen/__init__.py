@@ -0,0 +1,17 @@
+# encoding: utf-8
+"""
+datagen
+
+Data generation shared by the experiments: the tables loaded before an
+experiment (gentable.py in each experiment directory runs datagen.cli)
+and the streams of parameters of the experiments (GenWrites).
+"""
+
+from datagen.spec import Usage, readspec
+from datagen.output import Output, ColReader, spitvert, spitblock
+from datagen.engine import sample_wr, Permutation, Distribution, Column, CompositeKey
+from datagen.engine import Reference, ForeignColumn
+from datagen.engine import gencolumns, gentables, genblocks, genshards
+from datagen.manifest import Manifest
+from datagen.loadfile import LoadFile
+from datagen.params import GenWrites
@@ -0,0 +1,332 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+datagen/cli.py
+
+This file generates tables in file format for loading.
+Vertical bar delimited
+It is run through the gentable.py script of each experiment
+directory, which is how the examples below call it.
+
+Input as follows:
+python gentable numrows outfile specificationfile numkeyfields
+For example, suppose we want to produce data to go into
+roomtype(hotelid, roomtypeid, description)
+where the first two fields are the keys.
+
+If the file roomtypespec has the data
+hotel 0.25
+n 4.0
+desc 16.0
+
+The first field of each spec is either n in which case it
+is a numeric attribute, d in which case it is a date attribute,
+otherwise the attribute is a string composed of
+the first field postfixed with a generated integer.
+The second field of each spec is either 1 in which case
+the number of different values equals the number of rows
+or less than 1 in which case it is a fraction
+or it is a fixed number in which case the choice is from
+that number.
+In the above example, there are 1/4 as many distinct
+values of hotel as there are rows, there are only 4 room
+types and only 16 descriptions. For dates, these ranges
+are mapped on number of days from which the generated date
+is drawn.
+The optional third field is a base value added to the generated
+integers. The optional fourth field is the distribution of the
+values drawn with replacement: uniform (the default), zipf[:s],
+normal[:sigma] or hotspot[:f[:p]] (see datagen.Distribution), e.g.
+hotel 0.25 0 zipf:1.2
+Columns whose values are all distinct are not affected.
+
+Then we can produce the roomtype data as follows:
+python gentable.py 30 roomtype roomtypespec 2
+
+and we will produce a 30 row, 3 column output
+with the first two fields constituting a key.
+
+Rows are generated and written in blocks of -b rows (default 100000),
+so that memory stays bounded whatever the number of rows. Columns
+whose values must all be distinct (draw 1, or a fixed number of
+values at least as large as the number of rows) are drawn from a
+pseudo-random permutation computed one element at a time, which
+guarantees the uniqueness of the key as long as one of the key
+fields is such a column. Otherwise the key is drawn from a
+permutation of all the combinations of values of the key fields
+(32 in the example above), so that the table has exactly numrows
+rows with distinct keys; the key fields are then uniform, and there
+must be at least numrows combinations.
+
+With -e numpy, the numbers of each block are drawn and formatted
+as numpy arrays rather than one Python object at a time. numpy is
+only required for this engine.
+
+With -w N, blocks are generated by N worker processes. Permutations
+are set up once, before the workers start, so that keys remain unique
+and the numbers of distinct values are those of the whole table.
+Blocks are appended to outfile in order, or with -s each worker
+writes a contiguous range of rows to its own shard file outfile.000,
+outfile.001, ... (the header is in the first shard, so that
+concatenating the shards in order gives the whole table).
+
+With -S seed, the table is reproducible: the same seed, spec, number
+of rows and engine give the same rows, whatever the block size, the
+number of workers or the sharding. Numbers drawn with replacement
+come from one generator per column and per chunk of 10000 rows,
+derived from the seed, and permutations are keyed by the seed, so
+that -R lo:hi generates rows lo..hi-1 of the table alone, without
+generating the rows before lo (the header is only written when lo
+is 0). Date columns remain relative to the day of generation.
+
+With -f col, the table is written in a compact binary columnar format
+instead: a short text header describing the columns, followed by
+blocks made of a row count and, for each column, the generated
+integers as 4 or 8 byte little endian integers (dates are stored as
+days, string attributes as the integer following their prefix). The
+load utility cannot read this format; datagen.ColReader reads it back
+for the Python harnesses. Blocks are self-contained, so that shards
+can be concatenated.
+
+With -z gzip or -z zstd (zstd requires the zstandard module) the
+output is compressed on the fly, optionally at a given level, e.g.
+-z gzip:1. outfile may be - (stdout, progress messages then go to
+stderr), and with -p outfile is created as a named pipe, so that the
+loader consumes the rows while they are generated:
+python gentable.py -p 1000000 accounts.data accountspec 1 &
+db2 -tvf load.sql
+
+Related tables are generated together from a schema file instead:
+python gentable.py [options] schemafile
+where each line of schemafile describes a table as
+name numrows outfile specificationfile numkeyfields
+e.g.
+branches 1000 branches.data branchspec 1
+accounts 10000000 accounts.data accountspec 1
+A table is listed after the tables it references. In its
+specification file, a draw field of the form table.N makes the
+column a foreign key: its values are those of column N of table
+(a key column) in rows of table drawn with replacement, following
+the optional distribution field, e.g.
+branch branches.0 0 zipf:1.1
+(the attribute and base value of the referenced column are used).
+The columns of a table referencing the same table reference the
+same row of it, which covers composite foreign keys. Independently,
+the distribution field corr:N[:strength] correlates a column with
+column N of the same table (N before it): with probability strength,
+its value is the value of column N scaled to its own range, otherwise
+it is drawn independently, so that the correlation coefficient of the
+two columns is about strength (1, the default, is a functional
+dependency, 0 makes the columns independent). Each table is streamed to
+its own file, with the options above (except -R); with -S each
+table has its own generator derived from the seed.
+
+With -S, a single table is described by a manifest written next to
+it (outfile.manifest), from which deltas are generated later
+without reading the table back:
+python gentable.py -i 1000 accounts.data.manifest inserts.data
+python gentable.py -u 1000 accounts.data.manifest updates.data
+-i generates the next rows of the table, whose keys do not collide
+with the rows generated before (draw more values than rows for the
+unique key fields, so that new keys fall between existing ones),
+-u generates rows with the keys of rows generated before and new
+values for the other fields (see datagen/manifest.py). The manifest
+counts the rows of each delta, so that successive deltas differ.
+Each delta file has a header, like a table.
+
+(c) Philippe Bonnet, Dennis Shasha 2009, 2010.
+
+"""
+
+import sys
+import getopt
+import os
+
+from datagen.spec import Usage, readspec
+from datagen.output import FORMATS, COMPRESSIONS, Output, zstandard
+from datagen.engine import BLOCKSIZE, ENGINES, numpy
+from datagen.engine import gencolumns, gentables, genblocks, genshards
+from datagen.manifest import Manifest
+
+help_message = '''
+python gentable.py [options] numrows outfile specificationfile numkeyfields
+python gentable.py [options] schemafile
+python gentable.py [options] -i|-u numrows manifest outfile
+generates numrows vertical bar delimited rows in outfile
+based on the fields specified in specificationfile. The first
+numkeyfields fields of specificationfile are key.
+options:
+-h, --help       : this help message
+-b, --blocksize= : number of rows generated and written at a time (default 100000)
+-e, --engine=    : 'python' (default) or 'numpy' (requires numpy)
+-w, --workers=   : number of worker processes (default 1)
+-s, --shards     : each worker writes its own shard file outfile.NNN
+-S, --seed=      : seed (integer) making the generated table reproducible
+-R, --rows=      : range lo:hi of the rows to generate (default 0:numrows)
+-f, --format=    : 'del' (default, vertical bar delimited) or 'col' (binary columnar)
+-z, --compress=  : 'gzip' or 'zstd', optionally followed by :level (e.g. gzip:1)
+-p, --pipe       : create outfile as a named pipe (a loader reads it while rows are generated)
+-i, --inserts=   : number of rows to insert, generated from a manifest
+-u, --updates=   : number of rows to update, generated from a manifest
+outfile - writes to stdout
+schemafile lines: name numrows outfile specificationfile numkeyfields
+'''
+
+
+def messages(targfiles):
+    # the stream of the progress messages: stderr if rows are written to
+    # stdout, so that the messages do not mix with them
+    if '-' in targfiles: return sys.stderr
+    return sys.stdout
+
+def writetable(columns, lo, hi, targfile, msg, blocksize, workers, shards, fmt, compress, pipe, header=None):
+    # writes rows lo..hi-1 of the table into targfile (or its shards)
+    if pipe and not os.path.exists(targfile):
+        os.mkfifo(targfile)
+    if pipe:
+        print >> msg, "waiting for a reader on "+targfile+"..."
+    if shards:
+        print >> msg, "generating and writing shards..."
+        for shardfile in genshards(columns, lo, hi, targfile, blocksize, workers, fmt, compress, header):
+            print >> msg, shardfile
+    else:
+        o = Output(targfile, compress)
+        print >> msg, "generating and writing rows..."
+        for block in genblocks(columns, lo, hi, blocksize, workers, fmt, header):
+            o.write(block)
+        o.close()
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    try:
+        try:
+            opts, args = getopt.getopt(argv[1:], "hb:e:w:sS:R:f:z:pi:u:",
+              ["help", "blocksize=", "engine=", "workers=", "shards", "seed=", "rows=", "format=",
+               "compress=", "pipe", "inserts=", "updates="])
+        except getopt.error, msg:
+            raise Usage(msg)
+
+        blocksize = BLOCKSIZE
+        engine = 'python'
+        workers = 1
+        shards = False
+        seed = None
+        rows = None
+        fmt = 'del'
+        compress = None
+        pipe = False
+        delta = None
+        for option, value in opts:
+            if option in ("-h", "--help"):
+                raise Usage(help_message)
+                sys.exit(1)
+            if option in ("-b", "--blocksize"):
+                blocksize = int(value)
+                if blocksize < 1: raise Usage("Block size out of bounds")
+            if option in ("-e", "--engine"):
+                if not value in ENGINES: raise Usage("Engine not supported (python or numpy)")
+                if value == 'numpy' and numpy is None: raise Usage("numpy is not installed")
+                engine = value
+            if option in ("-w", "--workers"):
+                workers = int(value)
+                if workers < 1: raise Usage("Workers out of bounds")
+            if option in ("-s", "--shards"):
+                shards = True
+            if option in ("-S", "--seed"):
+                seed = int(value)
+            if option in ("-R", "--rows"):
+                try:
+                    rows = [int(v) for v in value.split(':')]
+                except ValueError:
+                    raise Usage("Row range should be lo:hi")
+                if len(rows) != 2 or rows[0] < 0 or rows[0] > rows[1]: raise Usage("Row range should be lo:hi")
+            if option in ("-f", "--format"):
+                if not value in FORMATS: raise Usage("Format not supported (del or col)")
+                fmt = value
+            if option in ("-z", "--compress"):
+                method = value.split(':')[0]
+                if not method in COMPRESSIONS: raise Usage("Compression not supported (gzip or zstd)")
+                if method == 'zstd' and zstandard is None: raise Usage("zstandard is not installed")
+                try:
+                    compress = (method, int((value.split(':')+[COMPRESSIONS[method]])[1]))
+                except ValueError:
+                    raise Usage("Compression level should be an integer")
+            if option in ("-p", "--pipe"):
+                pipe = True
+            if option in ("-i", "--inserts"):
+                delta = ('insert', int(value))
+                if delta[1] < 0: raise Usage("Inserts out of bounds")
+            if option in ("-u", "--updates"):
+                delta = ('update', int(value))
+                if delta[1] < 0: raise Usage("Updates out of bounds")
+            # other options silently ignored
+
+        # main
+        if len(args) == 4:
+            numrows = int(args[0])
+            targfile = args[1]
+            specfile = args[2]
+            numkeys = int(args[3])
+            if rows is None: rows = [0, numrows]
+            if rows[1] > numrows: raise Usage("Row range out of bounds")
+            lo, hi = rows
+            if shards and (pipe or targfile == '-'): raise Usage("Shards are written to files")
+            msg = messages([targfile])
+
+            # Extract columns specifications from specfile
+            print >> msg, "reading specfile..."
+            colspecs = readspec(specfile)
+            numcols = len(colspecs)
+
+            # Generate Table based on columns specifications
+            columns = gencolumns(numrows, numcols, colspecs, numkeys, engine, seed)
+            if seed is not None and targfile != '-':
+                Manifest(targfile+'.manifest', seed, numrows, colspecs, numkeys, engine).save()
+            writetable(columns, lo, hi, targfile, msg, blocksize, workers, shards, fmt, compress, pipe)
+
+            print >> msg, "done."
+        elif len(args) == 2 and delta is not None:
+            manifest = Manifest.load(args[0])
+            targfile = args[1]
+            if rows is not None: raise Usage("Row range of a delta not supported")
+            if shards and (pipe or targfile == '-'): raise Usage("Shards are written to files")
+            msg = messages([targfile])
+
+            # Generate the delta, then count it in the manifest
+            mode, k = delta
+            columns, lo, hi = manifest.delta(mode, k)
+            # a delta is a file of its own, with a header
+            writetable(columns, lo, hi, targfile, msg, blocksize, workers, shards, fmt, compress, pipe, True)
+            manifest.save()
+
+            print >> msg, "done."
+        elif len(args) == 1:
+            if rows is not None: raise Usage("Row range of a schema not supported")
+            schema = []
+            targfiles = []
+            for line in readspec(args[0]):
+                if len(line) != 5: raise Usage("schema lines should be: name numrows outfile specificationfile numkeyfields")
+                name, numrows, targfile, specfile, numkeys = line
+                if shards and (pipe or targfile == '-'): raise Usage("Shards are written to files")
+                schema.append((name, int(numrows), readspec(specfile), int(numkeys)))
+                targfiles.append(targfile)
+            msg = messages(targfiles)
+            print >> msg, "read schema and specfiles."
+
+            # Generate the tables, parents first
+            tables = gentables(schema, engine, seed)
+            for (name, numrows, colspecs, numkeys), targfile in zip(schema, targfiles):
+                print >> msg, name+":"
+                writetable(tables[name], 0, numrows, targfile, msg, blocksize, workers, shards, fmt, compress, pipe)
+
+            print >> msg, "done."
+
+    except Usage, err:
+        print >> sys.stderr, sys.argv[0].split("/")[-1] + ": " + str(err.msg)
+        print >> sys.stderr, "\t for help use --help"
+        return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
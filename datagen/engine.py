@@ -0,0 +1,687 @@
+# encoding: utf-8
+"""
+datagen/engine.py
+
+Generation of tables one block of rows at a time, from column
+specifications (see datagen/cli.py for the format and the options).
+
+Columns whose values must all be distinct are drawn from a Permutation,
+computed one element at a time; the other columns are drawn with
+replacement, uniformly or following a Distribution. A key without
+such a column is drawn from a permutation of its key space
+(CompositeKey), so that keys are unique without being held in memory.
+Any row of a permutation can be computed on its own, which is how
+the columns of a table reference the key of another table
+(ForeignColumn). Blocks can be
+generated by a pool of worker processes, and with a seed any block
+can be generated on its own.
+"""
+
+import re
+import math
+import operator
+import random
+import hashlib
+import struct
+import multiprocessing
+from datetime import date
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from datagen.spec import Usage
+from datagen.output import COLMAGIC, Output, spitvert, spitblock
+
+BLOCKSIZE = 100000   # Number of rows generated and written at a time
+CHUNK     = 10000    # Number of rows drawn from the same seeded generator
+ENGINES   = ['python', 'numpy']
+DISTRIBUTIONS = ['uniform', 'zipf', 'normal', 'hotspot']
+
+
+def sample_wr(n, k, rng=None):
+    # Chooses k random elements (with replacement) from range(n)
+    if rng is None: rng = random
+    n = max(n, 1)
+    _random, _int = rng.random, int  # speed hack
+    result = [None] * k
+    for i in xrange(k):
+        result[i] = _int(_random() * n)
+    return result
+
+class Permutation(object):
+    # Pseudo-random permutation of range(n), computed one element at a time
+    # with a balanced Feistel network (cycle walking brings the elements
+    # back into range), so that range(n) is never held in memory. Indices
+    # beyond n are left in place, so that a table keeps distinct keys when
+    # it grows beyond the key space (see datagen/manifest.py).
+    def __init__(self, n, rng=None, rounds=4):
+        if rng is None: rng = random
+        self.n = n
+        bits = max(2, (n-1).bit_length())
+        bits += bits % 2
+        self.half = bits / 2
+        self.mask = (1 << self.half) - 1
+        self.keys = [rng.getrandbits(32) for r in range(rounds)]
+
+    def encrypt(self, x):
+        half, mask = self.half, self.mask
+        l = x >> half
+        r = x & mask
+        for k in self.keys:
+            l, r = r, l ^ ((((r + k) * 0x5bd1e995) >> 7) & mask)
+        return (l << half) | r
+
+    def encrypt_array(self, x):
+        # same as encrypt, on a numpy array of uint64
+        half, mask = numpy.uint64(self.half), numpy.uint64(self.mask)
+        m, s = numpy.uint64(0x5bd1e995), numpy.uint64(7)
+        l = x >> half
+        r = x & mask
+        for k in self.keys:
+            l, r = r, l ^ ((((r + numpy.uint64(k)) * m) >> s) & mask)
+        return (l << half) | r
+
+    def lookup_array(self, indices):
+        # elements of the permutation at a numpy array of indices
+        indices = numpy.asarray(indices).astype(numpy.uint64)
+        beyond = indices >= numpy.uint64(self.n)
+        x = self.encrypt_array(numpy.where(beyond, numpy.uint64(0), indices))
+        out = x >= numpy.uint64(self.n)
+        while out.any():
+            x[out] = self.encrypt_array(x[out])
+            out = x >= numpy.uint64(self.n)
+        x[beyond] = indices[beyond]
+        return x.astype(numpy.int64)
+
+    def lookup(self, indices):
+        # elements of the permutation at indices
+        n, encrypt = self.n, self.encrypt
+        result = [None] * len(indices)
+        for j, i in enumerate(indices):
+            if i >= n:
+                result[j] = int(i)
+                continue
+            x = encrypt(i)
+            while x >= n:
+                x = encrypt(x)
+            result[j] = int(x)
+        return result
+
+    def take_array(self, lo, hi):
+        # elements lo..hi-1 of the permutation, as a numpy array
+        return self.lookup_array(numpy.arange(lo, hi, dtype=numpy.uint64))
+
+    def take(self, lo, hi):
+        # elements lo..hi-1 of the permutation
+        return self.lookup(xrange(lo, hi))
+
+
+class Distribution(object):
+    # Skewed draws with replacement from range(n). The distribution field of
+    # a spec is name[:param[:param]], where name is one of
+    #   zipf[:s]         value i drawn with probability ~ 1/(i+1)^s (s=1.0)
+    #   normal[:sigma]   centered on n/2, standard deviation sigma*n (0.1)
+    #   hotspot[:f[:p]]  a fraction p of the draws hit the first f*n values (0.2, 0.8)
+    # Zipf uses rejection-inversion sampling (Hormann and Derflinger, 1996),
+    # which needs neither a table of n probabilities nor more than a few
+    # random numbers per draw.
+    def __init__(self, field, n):
+        fields = field.split(':')
+        self.name = fields[0]
+        if not self.name in DISTRIBUTIONS:
+            raise Usage("Distribution not supported: "+field)
+        params = [float(f) for f in fields[1:]]
+        self.n = max(n, 1)
+        if self.name == 'zipf':
+            self.exponent = (params+[1.0])[0]
+            if self.exponent <= 0: raise Usage("Zipf exponent must be positive")
+            self.hx1 = self.hintegral(1.5) - 1.0
+            self.hn = self.hintegral(self.n + 0.5)
+            self.threshold = 2 - self.hintegral_inverse(self.hintegral(2.5) - self.h(2))
+        elif self.name == 'normal':
+            self.mean = (self.n-1)/2.0
+            self.sigma = (params+[0.1])[0]*self.n
+        elif self.name == 'hotspot':
+            f, self.p = (params+[0.2, 0.8][len(params):])[:2]
+            self.hot = min(self.n, max(1, int(round(f*self.n))))
+
+    # zipf helpers: h(x) = x^-s, its integral and the inverse of the integral
+    def h(self, x):
+        return math.exp(-self.exponent*math.log(x))
+
+    def hintegral(self, x):
+        logx = math.log(x)
+        t = (1-self.exponent)*logx
+        if abs(t) > 1e-8: return math.expm1(t)/t*logx
+        return (1 + t*0.5*(1 + t/3.0*(1 + 0.25*t)))*logx
+
+    def hintegral_inverse(self, x):
+        t = max(x*(1-self.exponent), -1.0)
+        if abs(t) > 1e-8: return math.exp(math.log1p(t)/t*x)
+        return math.exp((1 - t*(0.5 - t*(1/3.0 - 0.25*t)))*x)
+
+    def sample(self, k, rng=None):
+        # k draws, as a list
+        if rng is None: rng = random
+        n, _random = self.n, rng.random
+        result = [None] * k
+        for i in xrange(k):
+            if self.name == 'zipf':
+                while True:
+                    u = self.hn + _random()*(self.hx1 - self.hn)
+                    x = self.hintegral_inverse(u)
+                    r = min(max(int(x + 0.5), 1), n)
+                    if r - x <= self.threshold or u >= self.hintegral(r + 0.5) - self.h(r):
+                        break
+                result[i] = r-1
+            elif self.name == 'normal':
+                x = -1
+                while x < 0 or x >= n:
+                    x = int(round(rng.gauss(self.mean, self.sigma)))
+                result[i] = x
+            elif self.name == 'hotspot':
+                if _random() < self.p or self.hot == n:
+                    result[i] = int(_random()*self.hot)
+                else:
+                    result[i] = self.hot + int(_random()*(n-self.hot))
+            else:
+                result[i] = int(_random()*n)
+        return result
+
+    def sample_array(self, k, rng=None):
+        # k draws, as a numpy array
+        if rng is None: rng = numpy.random
+        n = self.n
+        if self.name == 'hotspot':
+            hot = rng.randint(0, self.hot, k)
+            if self.hot == n: return hot
+            cold = rng.randint(self.hot, n, k)
+            return numpy.where(rng.random_sample(k) < self.p, hot, cold)
+        elif self.name == 'uniform':
+            return rng.randint(0, n, k)
+        # zipf and normal reject out of range draws until k are accepted
+        result = numpy.empty(k, dtype=numpy.int64)
+        filled = 0
+        while filled < k:
+            m = k - filled
+            if self.name == 'zipf':
+                s = self.exponent
+                u = self.hn + rng.random_sample(m)*(self.hx1 - self.hn)
+                t = numpy.maximum(u*(1-s), -1.0)
+                with numpy.errstate(all='ignore'):
+                    x = numpy.exp(numpy.where(numpy.abs(t) > 1e-8, numpy.log1p(t)/t,
+                                              1 - t*(0.5 - t*(1/3.0 - 0.25*t)))*u)
+                r = numpy.clip(numpy.floor(x + 0.5), 1, n)
+                logr = numpy.log(r + 0.5)
+                t = (1-s)*logr
+                with numpy.errstate(all='ignore'):
+                    hint = numpy.where(numpy.abs(t) > 1e-8, numpy.expm1(t)/t,
+                                       1 + t*0.5*(1 + t/3.0*(1 + 0.25*t)))*logr
+                accepted = r[(r - x <= self.threshold) | (u >= hint - numpy.exp(-s*numpy.log(r)))] - 1
+            else:
+                x = numpy.rint(rng.normal(self.mean, self.sigma, m))
+                accepted = x[(x >= 0) & (x < n)]
+            result[filled:filled+len(accepted)] = accepted
+            filled += len(accepted)
+        return result
+
+
+def seeded(engine, *key):
+    # a generator for the engine, derived from key (seed, column, ...)
+    h = int(hashlib.md5(repr(key)).hexdigest(), 16)
+    if engine == 'numpy':
+        return numpy.random.RandomState(h % (1 << 32))
+    return random.Random(h)
+
+
+class Column(object):
+    # Generates the values of one column, one block of rows at a time
+    def __init__(self, spec, numrows, engine='python', seed=None, colno=0):
+        if engine == 'numpy' and numpy is None:
+            raise Usage("numpy engine requested but numpy is not installed")
+        self.engine = engine
+        self.seed = seed
+        self.colno = colno
+        self.numrows = numrows
+        rng = None
+        if seed is not None:
+            rng = seeded('python', seed, colno, 'perm')
+        # spec is of the form -- attribute draw basevalue distribution
+        self.attribute = spec[0]
+        draw = float(spec[1])
+        self.basevalue = 0
+        if (len(spec)>2):
+            self.basevalue = int(float(spec[2]))
+        # unique columns are drawn from a permutation, the others
+        # are drawn with replacement following the distribution (that
+        # of a unique column applies to the parameter streams drawn
+        # from it, see datagen/params.py)
+        self.perm = None
+        self.dist = None
+        # set when the column is a field of a CompositeKey
+        self.key = None
+        self.keypos = 0
+        # set when the column is correlated with another column
+        self.corr = None
+        self.strength = 0.0
+        # the numbers of the last block, which correlated columns share
+        self.last = None
+        if draw == 1:
+            self.numvalues = numrows
+            self.perm = Permutation(numrows, rng)
+        elif draw < 1:
+            self.numvalues = int(round(numrows*draw, 0))
+        elif draw > 1:
+            self.numvalues = int(round(draw, 0))
+            if self.numvalues >= numrows:
+                self.perm = Permutation(self.numvalues, rng)
+        if self.perm is None and len(spec)>3 and spec[3].startswith('corr'):
+            # corr:N[:strength] - correlated with column N, see correlated
+            fields = spec[3].split(':')
+            try:
+                self.corr = int(fields[1])
+                self.strength = float((fields[2:]+['1.0'])[0])
+            except (IndexError, ValueError):
+                raise Usage("Correlation should be corr:column[:strength]")
+            if not 0 <= self.strength <= 1: raise Usage("Correlation strength should be between 0 and 1")
+        elif len(spec)>3 and spec[3] != 'uniform' and not spec[3].startswith('corr'):
+            self.dist = Distribution(spec[3], self.numvalues)
+        # distinction between numerical attributes 'n', date 'd' and alphanumerical attributes ATT_NAME
+        if self.attribute == 'n':
+            self.desc = 'numeric'
+        elif self.attribute == 'd':
+            self.desc = 'date'
+            self.now_ordinal = date.toordinal(date.today())
+        else:
+            self.desc = 'varchar('+str(self.numvalues-1+self.basevalue)+')'
+        # integers are stored on 4 bytes in the columnar format if they fit
+        self.code = 'q'
+        if -2**31 <= self.basevalue and self.numvalues-1+self.basevalue < 2**31:
+            self.code = 'i'
+
+    def unique(self):
+        return self.perm is not None
+
+    def referenceable(self):
+        # the number of any row can be computed on its own
+        return self.perm is not None or self.key is not None
+
+    def lookup(self, rows):
+        # numbers (without basevalue) of the given rows, for referenceable columns
+        if self.perm is not None and self.engine == 'numpy':
+            return self.perm.lookup_array(rows)
+        elif self.perm is not None:
+            return self.perm.lookup(rows)
+        return self.key.lookup(rows)[self.keypos]
+
+    def sample(self, k, rng):
+        # k numbers drawn with replacement from rng
+        if self.engine == 'numpy':
+            if self.dist is not None:
+                return self.dist.sample_array(k, rng)
+            return rng.randint(0, max(self.numvalues, 1), k)
+        if self.dist is not None:
+            return self.dist.sample(k, rng)
+        return sample_wr(self.numvalues, k, rng)
+
+    def chunks(self, lo, hi):
+        # (start, end, key) of the chunks of rows lo..hi-1; the rows beyond
+        # the table (added by a delta) have chunks of their own
+        numrows = self.numrows
+        for c in xrange(lo/CHUNK, (min(hi, numrows)+CHUNK-1)/CHUNK if lo < numrows else 0):
+            yield c*CHUNK, min(numrows, (c+1)*CHUNK), (c,)
+        for c in xrange(max(lo-numrows, 0)/CHUNK, (hi-numrows+CHUNK-1)/CHUNK):
+            yield numrows+c*CHUNK, numrows+(c+1)*CHUNK, ('delta', c)
+
+    def drawn(self, lo, hi, sample=None, *tag):
+        # numbers of rows lo..hi-1 drawn with replacement (by sample(k, rng),
+        # self.sample by default); with a seed, each chunk of rows has its
+        # own generator (one per tag), and the whole chunk is drawn (bulk
+        # draws of different lengths are different sequences)
+        if sample is None: sample = self.sample
+        if self.seed is None:
+            if self.engine == 'numpy':
+                return sample(hi-lo, numpy.random)
+            return sample(hi-lo, random)
+        parts = []
+        for start, end, key in self.chunks(lo, hi):
+            numlist = sample(end-start, seeded(self.engine, self.seed, self.colno, *(tag+key)))
+            parts.append(numlist[max(lo-start, 0):hi-start])
+        if self.engine == 'numpy':
+            return numpy.concatenate(parts)
+        return [num for part in parts for num in part]
+
+    def uniform(self, k, rng):
+        # k numbers drawn uniformly from [0, 1)
+        if self.engine == 'numpy':
+            return rng.random_sample(k)
+        _random = rng.random
+        return [_random() for i in xrange(k)]
+
+    def correlated(self, lo, hi):
+        # numbers of rows lo..hi-1 following those of column corr: with
+        # probability strength, its number scaled to our range, otherwise
+        # a number drawn independently, so that the correlation coefficient
+        # is about strength (1 is a functional dependency, 0 none)
+        other = self.corr.raw(lo, hi)
+        own = self.drawn(lo, hi)
+        copied = self.drawn(lo, hi, self.uniform, 'corr')
+        n, m, strength = max(self.numvalues, 1), max(self.corr.numvalues, 1), self.strength
+        if self.engine == 'numpy':
+            return numpy.where(copied < strength, other*n//m, own)
+        return [o*n//m if c < strength else d for o, d, c in zip(other, own, copied)]
+
+    def raw(self, lo, hi):
+        # numbers of rows lo..hi-1, without basevalue; the last block is
+        # kept for correlated columns (unseeded draws cannot be repeated)
+        if self.last is not None and self.last[:2] == (lo, hi):
+            return self.last[2]
+        if self.perm is not None and self.engine == 'numpy':
+            numlist = self.perm.take_array(lo, hi)
+        elif self.perm is not None:
+            numlist = self.perm.take(lo, hi)
+        elif self.key is not None:
+            numlist = self.key.digits(lo, hi)[self.keypos]
+        elif self.corr is not None:
+            numlist = self.correlated(lo, hi)
+        else:
+            numlist = self.drawn(lo, hi)
+        self.last = (lo, hi, numlist)
+        return numlist
+
+    def numbers(self, lo, hi):
+        # generate the numbers used to generate attribute values of rows lo..hi-1
+        # (a numpy array with the numpy engine)
+        numlist = self.raw(lo, hi)
+        # adjust list of numbers to account for basevalue
+        if self.engine == 'numpy':
+            return numlist + self.basevalue
+        basevalue = self.basevalue
+        return [num+basevalue for num in numlist]
+
+    def header(self):
+        # description of the column in the columnar format
+        anchor = 0
+        if self.attribute == 'd':
+            anchor = self.now_ordinal
+        return '%s %s %d\n' % (self.attribute, self.code, anchor)
+
+    def packed(self, lo, hi):
+        # numbers of rows lo..hi-1 in the columnar format
+        numlist = self.numbers(lo, hi)
+        if self.engine == 'numpy':
+            return numlist.astype('<i'+str(struct.calcsize(self.code))).tostring()
+        return struct.pack('<%d%s' % (len(numlist), self.code), *numlist)
+
+    def values(self, lo, hi):
+        if self.engine == 'numpy':
+            return self.array_values(lo, hi)
+        return self.strings(self.numbers(lo, hi))
+
+    def strings(self, numlist):
+        # the values of numbers numlist (basevalue included), as strings
+        if self.attribute == 'n':
+            return [str(num) for num in numlist]
+        elif self.attribute == 'd':
+            now_ordinal = self.now_ordinal
+            return [date.isoformat(date.fromordinal(now_ordinal+num)) for num in numlist]
+        else:
+            attribute = self.attribute
+            return [attribute+str(num) for num in numlist]
+
+    def array_values(self, lo, hi):
+        # same as values, with the numbers drawn as a numpy array
+        # (str() of the elements of tolist() beats numpy's astype(str))
+        numlist = self.numbers(lo, hi)
+        if self.attribute == 'n':
+            return map(str, numlist.tolist())
+        elif self.attribute == 'd':
+            now = numpy.datetime64(date.fromordinal(self.now_ordinal), 'D')
+            return (now + numlist).astype(str).tolist()
+        else:
+            attribute = self.attribute
+            return [attribute+num for num in map(str, numlist.tolist())]
+
+
+class CompositeKey(object):
+    # Key fields none of which is unique: row i gets the i-th element of a
+    # permutation of the key space (the product of the numbers of values
+    # of the fields) written in mixed radix, one digit per field, so that
+    # the keys of the numrows rows are distinct. The fields are uniform,
+    # their distribution is ignored.
+    def __init__(self, columns, numrows, engine='python', seed=None):
+        self.engine = engine
+        self.radices = [max(c.numvalues, 1) for c in columns]
+        space = reduce(operator.mul, self.radices, 1)
+        if space < numrows:
+            raise Usage("not enough distinct key values in specfile (%d for %d rows)" % (space, numrows))
+        rng = None
+        if seed is not None:
+            rng = seeded('python', seed, 'key')
+        self.perm = Permutation(space, rng)
+        # the digits of the last block, shared by the fields
+        self.last = None
+
+    def split(self, numbers):
+        # the last digit is not reduced: numbers beyond the key space (rows
+        # added by a delta) exceed the range of the last field, but remain
+        # distinct
+        digits = []
+        for radix in self.radices[:-1]:
+            digits.append([num % radix for num in numbers])
+            numbers = [num // radix for num in numbers]
+        digits.append(numbers)
+        return digits
+
+    def split_array(self, numbers):
+        digits = []
+        for radix in self.radices[:-1]:
+            digits.append(numbers % radix)
+            numbers = numbers // radix
+        digits.append(numbers)
+        return digits
+
+    def lookup(self, rows):
+        # the numbers of the given rows of each field
+        if self.engine != 'numpy':
+            return self.split(self.perm.lookup(rows))
+        elif self.perm.n < 2**62:
+            return self.split_array(self.perm.lookup_array(rows))
+        # beyond int64, the digits are computed on Python longs
+        return [numpy.array(d, dtype=numpy.int64) for d in self.split(self.perm.lookup(numpy.asarray(rows).tolist()))]
+
+    def digits(self, lo, hi):
+        # the numbers of rows lo..hi-1 of each field
+        if self.last is not None and self.last[:2] == (lo, hi):
+            return self.last[2]
+        if self.engine == 'numpy':
+            digits = self.lookup(numpy.arange(lo, hi, dtype=numpy.uint64))
+        else:
+            digits = self.lookup(xrange(lo, hi))
+        self.last = (lo, hi, digits)
+        return digits
+
+
+class Reference(Column):
+    # Rows of a parent table referenced by the rows of a table, drawn with
+    # replacement from range(parentrows), uniformly or following a
+    # distribution; shared by the columns referencing the same table, so
+    # that each row references a single parent row.
+    def __init__(self, parentrows, numrows, field=None, engine='python', seed=None, colno=0):
+        self.engine = engine
+        self.seed = seed
+        self.colno = colno
+        self.numrows = numrows
+        self.numvalues = parentrows
+        self.dist = None
+        if field is not None and field != 'uniform':
+            self.dist = Distribution(field, parentrows)
+        self.last = None
+
+    def raw(self, lo, hi):
+        if self.last is not None and self.last[:2] == (lo, hi):
+            return self.last[2]
+        self.last = (lo, hi, self.drawn(lo, hi))
+        return self.last[2]
+
+
+class ForeignColumn(Column):
+    # Column whose values are those of a key column of a parent table, in
+    # the parent rows drawn by reference: the values always exist in the
+    # parent table, and the column has the attribute, base value and
+    # description of the parent column.
+    def __init__(self, parent, reference):
+        self.parent = parent
+        self.reference = reference
+        self.engine = parent.engine
+        self.attribute = parent.attribute
+        self.basevalue = parent.basevalue
+        self.numvalues = parent.numvalues
+        self.desc = parent.desc
+        self.code = parent.code
+        self.corr = None
+        if self.attribute == 'd':
+            self.now_ordinal = parent.now_ordinal
+
+    def unique(self):
+        return False
+
+    def referenceable(self):
+        return False
+
+    def raw(self, lo, hi):
+        return self.parent.lookup(self.reference.raw(lo, hi))
+
+
+def reference(spec):
+    # (table, column) if the draw field of spec is of the form table.N
+    m = re.match(r'^([A-Za-z_]\w*)\.(\d+)$', spec[1])
+    if m is None:
+        return None
+    return m.group(1), int(m.group(2))
+
+
+def gencolumns(numrows, numcols, colspecs, numkeys, engine='python', seed=None, tables=None):
+    # tables maps the names of the tables already generated to their
+    # columns, for the columns referencing them
+    if numkeys > numcols:
+        raise Usage("error in specfile: numkeys > numcols")
+    if tables is None: tables = {}
+    columns = []
+    references = {}
+    for i in range(numcols):
+        ref = reference(colspecs[i])
+        if ref is None:
+            columns.append(Column(colspecs[i], numrows, engine, seed, i))
+            continue
+        table, colno = ref
+        if not table in tables:
+            raise Usage("reference to unknown table "+table+" (a table is listed before the tables referencing it)")
+        if colno >= len(tables[table]) or not tables[table][colno].referenceable():
+            raise Usage("reference to "+colspecs[i][1]+", which is not a key column")
+        if not table in references:
+            parentrows = tables[table][colno].numrows
+            references[table] = Reference(parentrows, numrows, (colspecs[i][3:]+[None])[0], engine, seed, i)
+        columns.append(ForeignColumn(tables[table][colno], references[table]))
+    for i, c in enumerate(columns):
+        if c.corr is not None:
+            if not 0 <= c.corr < i:
+                raise Usage("a column can only be correlated with a column before it")
+            c.corr = columns[c.corr]
+    # the key is unique by construction if one of its fields is unique
+    keycolumns = columns[:numkeys]
+    if any([isinstance(c, ForeignColumn) for c in keycolumns]):
+        raise Usage("a key field cannot reference another table")
+    if keycolumns and not any([c.unique() for c in keycolumns]):
+        key = CompositeKey(keycolumns, numrows, engine, seed)
+        for i, c in enumerate(keycolumns):
+            c.key, c.keypos = key, i
+    return columns
+
+def genheader(columns, fmt='del'):
+    if fmt == 'col':
+        return COLMAGIC + str(len(columns)) + '\n' + ''.join([c.header() for c in columns])
+    return spitvert(tuple([c.desc for c in columns]))
+
+def genblock(columns, lo, hi, fmt='del'):
+    # rows lo..hi-1 rendered as one string
+    if fmt == 'col':
+        return struct.pack('<q', hi-lo) + ''.join([c.packed(lo, hi) for c in columns])
+    return spitblock([c.values(lo, hi) for c in columns])
+
+# Columns of the table, in worker processes
+worker_columns = None
+
+def initworker(columns):
+    global worker_columns
+    worker_columns = columns
+    # forked workers would otherwise all draw the same numbers
+    random.seed()
+    if numpy is not None:
+        numpy.random.seed()
+
+def workerblock(r):
+    return genblock(worker_columns, r[0], r[1], r[2])
+
+def workershard(args):
+    lo, hi, blocksize, fmt, compress, header, shardfile = args
+    o = Output(shardfile, compress)
+    o.write(header)
+    for l in xrange(lo, hi, blocksize):
+        o.write(genblock(worker_columns, l, min(l+blocksize, hi), fmt))
+    o.close()
+    return shardfile
+
+def genblocks(columns, lo, hi, blocksize=BLOCKSIZE, workers=1, fmt='del', header=None):
+    # Generates rows lo..hi-1 of the table (preceded by the header if lo
+    # is 0, or if header is True) as blocks of at most blocksize rows,
+    # each rendered as one string.
+    if header is None: header = lo == 0
+    if header:
+        yield genheader(columns, fmt)
+    ranges = [(l, min(l+blocksize, hi), fmt) for l in xrange(lo, hi, blocksize)]
+    if workers == 1:
+        for l, h, f in ranges:
+            yield genblock(columns, l, h, fmt)
+        return
+    pool = multiprocessing.Pool(workers, initworker, (columns,))
+    try:
+        # a few blocks per worker at a time, so that memory stays bounded
+        window = 4*workers
+        for w in xrange(0, len(ranges), window):
+            for block in pool.imap(workerblock, ranges[w:w+window]):
+                yield block
+    finally:
+        pool.terminate()
+
+def genshards(columns, lo, hi, targfile, blocksize=BLOCKSIZE, workers=1, fmt='del', compress=None, header=None):
+    # Worker k writes the k-th of workers equal ranges of rows lo..hi-1
+    # into targfile.k; the header goes into the first shard if lo is 0
+    # (or if header is True).
+    if header is None: header = lo == 0
+    text = ''
+    if header:
+        text = genheader(columns, fmt)
+    n = hi - lo
+    shards = [(lo+k*n/workers, lo+(k+1)*n/workers, blocksize, fmt, compress,
+               text if k == 0 else '', '%s.%03d' % (targfile, k)) for k in range(workers)]
+    pool = multiprocessing.Pool(workers, initworker, (columns,))
+    try:
+        return pool.map(workershard, shards)
+    finally:
+        pool.terminate()
+
+def gentables(schema, engine='python', seed=None):
+    # Columns of the tables of schema, a list of (name, numrows, colspecs,
+    # numkeys) where a table comes after the tables it references. Each
+    # table has its own seed derived from seed, and its columns can then
+    # be generated like those of a single table.
+    tables = {}
+    for name, numrows, colspecs, numkeys in schema:
+        if name in tables: raise Usage("table "+name+" is listed twice")
+        tseed = seed
+        if seed is not None:
+            tseed = (seed, name)
+        tables[name] = gencolumns(numrows, len(colspecs), colspecs, numkeys, engine, tseed, tables)
+    return tables
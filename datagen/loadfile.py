@@ -0,0 +1,122 @@
+# encoding: utf-8
+"""
+datagen/loadfile.py
+
+Rows of a load file (vertical bar delimited, as written by gentable),
+read in place from a memory map rather than parsed into Python objects.
+The offsets of the rows are indexed once, and kept next to the file
+(loadfile.idx) for the next runs, so that the harnesses can draw rows
+of the loaded table - keys that actually exist - from files of several
+GB. Only the rows drawn are parsed.
+"""
+
+import os
+import re
+import mmap
+import array
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from datagen.spec import Usage
+from datagen.engine import sample_wr
+
+WINDOW = 1 << 26   # Number of bytes scanned at a time when indexing with numpy
+HEADER = re.compile(r'^(numeric|date|varchar\(\d+\))$')
+
+
+def isheader(fields):
+    # the first line written by gentable describes the columns
+    return all([HEADER.match(f) for f in fields])
+
+def field(f):
+    # numbers are returned as integers, like the parameters of GenWrites
+    if f.isdigit() or (f[:1] == '-' and f[1:].isdigit()):
+        return int(f)
+    return f
+
+
+class LoadFile(object):
+    # Rows of a load file, indexed by their offsets in a memory map
+    def __init__(self, path, delimiter='|'):
+        self.path = path
+        self.delimiter = delimiter
+        try:
+            f = open(path, 'rb')
+        except IOError:
+            raise Usage("Failed to open load file "+path)
+        self.size = os.fstat(f.fileno()).st_size
+        if self.size == 0:
+            f.close()
+            raise Usage("Load file is empty: "+path)
+        self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        f.close()
+        self.index = self.loadindex()
+        if self.index is None:
+            self.index = self.buildindex()
+            self.saveindex()
+        self.first = 0
+        if isheader(self.fields(0)):
+            self.first = 1
+
+    def __len__(self):
+        return len(self.index) - self.first
+
+    def buildindex(self):
+        # offsets of the beginning of the lines
+        index = array.array('l', [0])
+        if numpy is not None:
+            for lo in xrange(0, self.size, WINDOW):
+                window = numpy.frombuffer(self.map, numpy.uint8, min(WINDOW, self.size-lo), lo)
+                index.fromstring((numpy.flatnonzero(window == 10) + (lo+1)).astype('l').tostring())
+        else:
+            find = self.map.find
+            p = find('\n')
+            while p >= 0:
+                index.append(p+1)
+                p = find('\n', p+1)
+        # no line after the last newline
+        if index[-1] >= self.size:
+            index.pop()
+        return index
+
+    def loadindex(self):
+        # the index kept by a previous run, unless the file changed since
+        name = self.path + '.idx'
+        try:
+            if os.path.getmtime(name) < os.path.getmtime(self.path):
+                return None
+            f = open(name, 'rb')
+            index = array.array('l')
+            index.fromstring(f.read())
+            f.close()
+        except (IOError, OSError, ValueError):
+            return None
+        if len(index) == 0 or index[0] != 0 or index[-1] >= self.size:
+            return None
+        return index
+
+    def saveindex(self):
+        try:
+            f = open(self.path + '.idx', 'wb')
+            self.index.tofile(f)
+            f.close()
+        except IOError:
+            pass    # e.g. read-only directory, the index is rebuilt next time
+
+    def fields(self, i):
+        # the fields of line i, as strings
+        start = self.index[i]
+        end = self.map.find('\n', start)
+        if end < 0:
+            end = self.size
+        return self.map[start:end].rstrip('\r').split(self.delimiter)
+
+    def row(self, i):
+        # row i of the table (the header excluded)
+        return tuple([field(f) for f in self.fields(self.first+i)])
+
+    def sample(self, k, rng=None):
+        # k rows drawn with replacement
+        return [self.row(i) for i in sample_wr(len(self), k, rng)]
@@ -0,0 +1,93 @@
+# encoding: utf-8
+"""
+datagen/manifest.py
+
+Incremental generation of a seeded table. gentable writes a manifest
+next to each table generated with a seed: the seed, the spec and the
+number of rows of the table, plus the number of rows generated since.
+From the manifest alone, without reading the table back:
+- inserts are the next rows of the table, numrows, numrows+1, ...
+  Their unique key fields take the values of the permutation not used
+  by the table (e.g. half of them with n 2000000.0 for 1000000 rows)
+  and then values beyond it, so that they never collide with the
+  rows already generated.
+- updates are rows whose key is the key of a row already generated
+  (drawn with replacement) and whose other fields are new.
+The manifest keeps track of the rows generated, so that successive
+deltas follow each other.
+"""
+
+from datagen.spec import Usage, readspec
+from datagen.engine import ENGINES, gencolumns, Reference, ForeignColumn
+
+MODES = ['insert', 'update']
+
+
+class Manifest(object):
+    # What is needed to generate more rows of a seeded table
+    def __init__(self, path, seed, numrows, colspecs, numkeys, engine='python'):
+        self.path = path
+        self.seed = seed
+        self.numrows = numrows
+        self.colspecs = colspecs
+        self.numkeys = numkeys
+        self.engine = engine
+        # rows of the table generated so far (inserted), and update rows
+        self.inserted = numrows
+        self.updated = 0
+
+    @staticmethod
+    def load(path):
+        fields = {}
+        colspecs = []
+        try:
+            lines = readspec(path)
+        except IOError:
+            raise Usage("Failed to open manifest "+path)
+        for line in lines:
+            if line[0] == 'spec':
+                colspecs.append(line[1:])
+            elif len(line) == 2:
+                fields[line[0]] = line[1]
+        try:
+            m = Manifest(path, int(fields['seed']), int(fields['numrows']), colspecs,
+                         int(fields['numkeys']), fields['engine'])
+            m.inserted = int(fields['inserted'])
+            m.updated = int(fields['updated'])
+        except (KeyError, ValueError):
+            raise Usage("Invalid manifest "+path)
+        if not m.engine in ENGINES: raise Usage("Invalid manifest "+path)
+        return m
+
+    def save(self):
+        f = open(self.path, 'w')
+        f.write('/ gentable manifest, see datagen/manifest.py\n')
+        for name in ['seed', 'numrows', 'numkeys', 'engine', 'inserted', 'updated']:
+            f.write('%s %s\n' % (name, getattr(self, name)))
+        for spec in self.colspecs:
+            f.write('spec %s\n' % ' '.join(spec))
+        f.close()
+
+    def columns(self, seed=None):
+        if seed is None: seed = self.seed
+        return gencolumns(self.numrows, len(self.colspecs), self.colspecs, self.numkeys, self.engine, seed)
+
+    def delta(self, mode, k):
+        # (columns, lo, hi): rows lo..hi-1 of columns are the k rows of the
+        # next delta; the manifest counts them (save it once they are used)
+        if not mode in MODES: raise Usage("Delta mode not supported (insert or update)")
+        if mode == 'insert':
+            lo = self.inserted
+            self.inserted += k
+            return self.columns(), lo, lo+k
+        # updates: new values drawn with a seed of their own, under the keys
+        # of rows already inserted
+        columns = self.columns((self.seed, 'update'))
+        keycolumns = self.columns()[:self.numkeys]
+        if not keycolumns or not all([c.referenceable() for c in keycolumns]):
+            raise Usage("Updates require a key whose fields are all unique, or without unique field")
+        reference = Reference(self.inserted, self.numrows, None, self.engine, (self.seed, 'update'), 'key')
+        columns[:self.numkeys] = [ForeignColumn(c, reference) for c in keycolumns]
+        lo = self.updated
+        self.updated += k
+        return columns, lo, lo+k
@@ -0,0 +1,114 @@
+# encoding: utf-8
+"""
+datagen/output.py
+
+Output of the generated tables: vertical bar delimited rows (the format
+load.sql reads with coldel|), the binary columnar format and its reader,
+and output files that may be compressed, named pipes or stdout.
+"""
+
+import sys
+import struct
+import gzip
+from datetime import date
+from itertools import izip
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from datagen.spec import Usage
+
+FORMATS   = ['del', 'col']
+COLMAGIC  = 'gentable col 1\n'
+COMPRESSIONS = {'gzip': 6, 'zstd': 3}   # Compressions and default levels
+
+
+def spitvert(row):
+    # row is a tuple
+    return '|'.join(map(str, row))+'\n'
+
+def spitblock(attvalues):
+    # attvalues is a list of columns of strings, all of the same length;
+    # the rows of the block are rendered in a single string
+    if attvalues == [] or len(attvalues[0]) == 0:
+        return ''
+    return '\n'.join(map('|'.join, izip(*attvalues)))+'\n'
+
+
+class Output(object):
+    # The generated table: a file, a named pipe or stdout ('-'),
+    # optionally compressed on the fly
+    def __init__(self, targfile, compress=None):
+        self.f = sys.stdout
+        if targfile != '-':
+            self.f = open(targfile, "wb")
+        self.z = None
+        if compress is not None:
+            method, level = compress
+            if method == 'gzip':
+                self.z = gzip.GzipFile(targfile, "wb", level, self.f)
+            else:
+                self.z = zstandard.ZstdCompressor(level=level).stream_writer(self.f)
+
+    def write(self, data):
+        if self.z is not None:
+            self.z.write(data)
+        else:
+            self.f.write(data)
+
+    def close(self):
+        if isinstance(self.z, gzip.GzipFile):
+            self.z.close()
+        elif self.z is not None:
+            self.z.flush(zstandard.FLUSH_FRAME)
+        if self.f is sys.stdout:
+            self.f.flush()
+        else:
+            self.f.close()
+
+
+class ColReader(object):
+    # Reads back a table written in the columnar format (-f col)
+    def __init__(self, filename):
+        self.f = open(filename, 'rb')
+        if self.f.readline() != COLMAGIC:
+            raise Usage(filename+" is not in the columnar format")
+        numcols = int(self.f.readline())
+        self.columns = [self.f.readline().split() for i in range(numcols)]
+
+    def blocks(self):
+        # blocks of rows, as lists of columns of integers
+        while True:
+            head = self.f.read(8)
+            if head == '':
+                break
+            k = struct.unpack('<q', head)[0]
+            block = []
+            for attribute, code, anchor in self.columns:
+                data = self.f.read(k*struct.calcsize(code))
+                block.append(struct.unpack('<%d%s' % (k, code), data))
+            yield block
+
+    def rows(self):
+        # rows as tuples, numeric attributes as integers, dates and
+        # strings as they appear in the delimited format
+        for block in self.blocks():
+            attvalues = []
+            for (attribute, code, anchor), numlist in zip(self.columns, block):
+                if attribute == 'n':
+                    attvalues.append(numlist)
+                elif attribute == 'd':
+                    anchor = int(anchor)
+                    attvalues.append([date.isoformat(date.fromordinal(anchor+num)) for num in numlist])
+                else:
+                    attvalues.append([attribute+str(num) for num in numlist])
+            for row in izip(*attvalues):
+                yield row
+
+    def __iter__(self):
+        return self.rows()
+
+    def close(self):
+        self.f.close()
+
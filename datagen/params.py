@@ -0,0 +1,149 @@
+# encoding: utf-8
+"""
+datagen/params.py
+
+Streams of parameters for the experiments (tuples to insert, keys to
+update or to query), generated from a specification file by the
+columns of the engine, like the tables they are run against.
+"""
+
+import random
+
+from datagen.spec import Usage, readspec
+from datagen.engine import gencolumns, sample_wr, seeded
+from datagen.manifest import Manifest
+from datagen.loadfile import LoadFile
+
+CHUNKSIZE = 10000  # Number of parameter tuples generated at a time
+
+
+class GenWrites(object):
+    # Stream of numwrites tuples following a specification file: the rows
+    # of a table of numrows rows, generated by the columns of the engine
+    # (see datagen/engine.py), so that keys are distinct (beyond numrows
+    # rows, they exceed the key space). A skewed column is drawn with
+    # replacement following its distribution, even if it is a key:
+    # repeated keys are the point of a skewed stream of writes. With
+    # distinct False (e.g. the parameters of queries), the tuples are
+    # rows of the table drawn with replacement, whose keys may repeat.
+    # The tuples are generated lazily, CHUNKSIZE at a time, as they are
+    # consumed.
+    # With the manifest of the loaded table, the tuples are instead a delta
+    # of the table (mode insert or update, see datagen/manifest.py): they
+    # are rows not loaded yet, or rows with the keys of rows loaded. With
+    # the load file of the table, the tuples are rows of the file drawn
+    # with replacement (see datagen/loadfile.py).
+    # With attributes (positions of columns, in order), the tuples have
+    # only those columns, and only those are generated.
+    def __init__(self, numrows, numkeys, numwrites, specfile, seed=None, manifest=None, mode='insert',
+                 loadfile=None, distinct=True, attributes=None):
+        self.numrows   = numrows
+        self.numkeys   = numkeys
+        self.numwrites = numwrites
+        self.distinct  = distinct
+        self.attributes = attributes
+        self.generated = 0
+        self.buffer = []
+        # a seeded generator makes the generated parameters reproducible
+        self.seed      = seed
+        self.random    = random.Random(seed)
+        # state of the generator at the start of the stream, for rewind
+        self.start = self.random.getstate()
+        self.delta = None
+        self.load = None
+        if manifest is not None:
+            # the rows of the delta are counted in the manifest right away,
+            # so that the next experiment gets new ones
+            print "reading manifest..."
+            m = Manifest.load(manifest)
+            self.delta = m.delta(mode, numwrites)
+            m.save()
+            return
+        if loadfile is not None:
+            print "indexing load file..."
+            self.load = LoadFile(loadfile)
+            return
+        # Extract columns specifications from specfile
+        print "reading specfile..."
+        colspecs = readspec(specfile)
+        # the columns are always seeded (at random without a seed), so
+        # that any chunk of the stream can be generated again; the seed
+        # differs from that of a table generated with the same seed
+        colseed = seed
+        if seed is None:
+            colseed = self.random.getrandbits(64)
+        self.colseed = (colseed, 'params')
+        self.columns = gencolumns(numrows, len(colspecs), colspecs, numkeys, 'python', self.colseed)
+        if attributes is not None:
+            if any([not 0 <= j < len(colspecs) for j in attributes]):
+                raise Usage("Attribute out of bounds (not a column of the specfile)")
+            self.columns = [self.columns[j] for j in attributes]
+
+    def rewind(self):
+        # restarts the stream: the same tuples are generated again
+        self.random.setstate(self.start)
+        self.generated = 0
+        self.buffer = []
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        if not self.buffer:
+            self.buffer = self.genchunk()
+            self.buffer.reverse()
+        if not self.buffer:
+            raise StopIteration
+        return self.buffer.pop()
+
+    def genchunk(self):
+        # generates the next tuples, at most CHUNKSIZE
+        k = min(CHUNKSIZE, self.numwrites - self.generated)
+        if k <= 0: return []
+        if self.delta is not None:
+            return self.project(self.gendelta(k))
+        if self.load is not None:
+            self.generated += k
+            return self.project(self.load.sample(k, self.random))
+        lo, hi = self.generated, self.generated+k
+        rows = None
+        if not self.distinct:
+            rows = sample_wr(self.numrows, k, seeded('python', self.colseed, 'rows', lo))
+        attvalues = [self.genvalues(c, lo, hi, rows) for c in self.columns]
+        self.generated += k
+        return zip(*attvalues)
+
+    def project(self, writes):
+        # the attributes of the rows writes
+        if self.attributes is None:
+            return writes
+        return [tuple([t[j] for j in self.attributes]) for t in writes]
+
+    def genvalues(self, c, lo, hi, rows):
+        # values of column c in tuples lo..hi-1 of the stream, numbers as
+        # integers; with rows (drawn with replacement), the unique and key
+        # columns take their values in those rows of the table
+        if c.dist is not None:
+            numlist = [num+c.basevalue for num in c.drawn(lo, hi)]
+        elif rows is not None and c.referenceable():
+            numlist = [num+c.basevalue for num in c.lookup(rows)]
+        else:
+            numlist = c.numbers(lo, hi)
+        if c.attribute == 'n':
+            return numlist
+        return c.strings(numlist)
+
+    def gendelta(self, k):
+        # the next k rows of the delta, numbers as integers
+        columns, lo, hi = self.delta
+        lo += self.generated
+        attvalues = []
+        for c in columns:
+            if c.attribute == 'n':
+                numlist = c.numbers(lo, lo+k)
+                if not isinstance(numlist, list): numlist = numlist.tolist()
+                attvalues.append(numlist)
+            else:
+                attvalues.append(c.values(lo, lo+k))
+        self.generated += k
+        return zip(*attvalues)
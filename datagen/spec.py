@@ -0,0 +1,26 @@
+# encoding: utf-8
+"""
+datagen/spec.py
+
+Specification files, one column per line:
+attribute draw [basevalue [distribution]]
+Lines starting with / are comments (see datagen/cli.py for the format).
+"""
+
+
+class Usage(Exception):
+    def __init__(self, msg):
+        self.msg = msg
+
+
+def readspec(specfile):
+    # Column specifications of specfile, as lists of fields
+    # (empty lines and comments are skipped)
+    colspecs = []
+    f = open(specfile)
+    for l in f:
+        l = l.strip()
+        if len(l) > 1 and l[0] != '/':
+            colspecs.append(l.split())
+    f.close()
+    return colspecs
@@ -4,3 +4,6 @@ HOSTNAME = 'localhost'
 PORT     = 50000
 USERNAME = 'db2inst1'
 PASSWORD = 'tuning1'
+# Driver of the harnesses: 'ibm_db' (DB2) or 'sqlite' (a local SQLite
+# database, DATABASE.sqlite in the experiment directory, see driver/)
+DRIVER   = 'ibm_db'
@@ -0,0 +1,50 @@
+# encoding: utf-8
+"""
+driver
+
+The database driver of the experiment harnesses (LogIO/writes.py,
+Indexing/reads.py, Assignment1/ValueOfSerializability/sumNswap.py): a
+module with the functions of ibm_db that they call (pconnect, prepare,
+execute, execute_many, fetch_tuple, commit, close, ...), chosen with
+DRIVER in ../db2.py or the -D option of a harness:
+- ibm_db: DB2, the database of the experiments (ibm_db, with the few
+  functions of driver/ibmdb.py that it lacks).
+- sqlite: a local SQLite database standing in for DB2 (driver/sqlite.py),
+  to run the harnesses, and measure their own overhead, without DB2.
+
+runsql.py in each experiment directory runs sql files (init.sql,
+load.sql, ...) through the driver, see driver/cli.py.
+
+The packages datagen, bench and driver sit next to db2.py, and the
+harnesses import them the same way, after sys.path.append(".."):
+import driver
+db = driver.load(driver.configured())
+"""
+
+from datagen.spec import Usage
+
+DRIVERS = ['ibm_db', 'sqlite']
+DEFAULT = 'ibm_db'  # Driver when db2.py has no DRIVER
+
+
+def configured():
+    # the DRIVER of the db2.py on the path (../db2.py of a harness)
+    try:
+        from db2 import DRIVER
+    except ImportError:
+        return DEFAULT
+    return DRIVER
+
+
+def load(name):
+    # the module of driver name
+    if name == 'ibm_db':
+        try:
+            from driver import ibmdb
+        except ImportError:
+            raise Usage("The ibm_db driver is not installed (use -D sqlite without DB2)")
+        return ibmdb
+    if name == 'sqlite':
+        from driver import sqlite
+        return sqlite
+    raise Usage("Driver not supported (ibm_db or sqlite)")
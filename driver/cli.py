@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+driver/cli.py
+
+Runs sql files against the database described in ../db2.py, through
+the driver of the harnesses (see driver/__init__.py). It is run
+through the runsql.py script of each experiment directory, e.g. to
+prepare a local SQLite database for the harnesses:
+
+python gentable.py 1000000 accounts.data accountspec 1
+python runsql.py -D sqlite init.sql load.sql
+
+Each non empty line of a file is a statement (the statements of the
+experiments are one line each); lines starting with -- are comments.
+With DB2, load.sql is a command of the db2 command line processor
+rather than a statement, and is still run with db2 -tvf load.sql.
+"""
+
+import sys
+import getopt
+import time
+
+from datagen.spec import Usage
+import driver
+
+help_message = '''
+python runsql.py [options] sqlfile ...
+options:
+-h, --help       : this help message
+-D, --driver=    : database driver ('ibm_db' or 'sqlite', default DRIVER of ../db2.py)
+-k, --keepgoing  : runs the next statements when a statement fails
+
+Executes the statements of the sql files, in order, against the database
+described in ../db2.py, and commits after each file.
+
+Examples:
+python runsql.py -D sqlite init.sql load.sql
+python runsql.py -D sqlite -k cleanup.sql
+'''
+
+def statements(path):
+    try:
+        f = open(path)
+    except IOError:
+        raise Usage("Failed to open "+path)
+    lines = [l.strip() for l in f]
+    f.close()
+    return [l for l in lines if l and not l.startswith('--')]
+
+def main(argv=None):
+    from db2 import DATABASE, USERNAME, PASSWORD
+    DRIVER = driver.configured()
+    keepgoing = False
+    try:
+        if argv is None:
+            argv = sys.argv
+        try:
+            opts, args = getopt.getopt(argv[1:], "hD:k", ["help", "driver=", "keepgoing"])
+        except getopt.error, msg:
+            raise Usage(msg)
+        for option, value in opts:
+            if option in ("-h", "--help"):
+                raise Usage(help_message)
+            if option in ("-D", "--driver"):
+                if not value in driver.DRIVERS: raise Usage("Driver not supported (ibm_db or sqlite)")
+                DRIVER = value
+            if option in ("-k", "--keepgoing"):
+                keepgoing = True
+        if len(args) == 0: raise Usage(help_message)
+
+        db = driver.load(DRIVER)
+        conn = db.pconnect(DATABASE, USERNAME, PASSWORD)
+        if conn is None: raise Usage(db.conn_errormsg())
+        db.autocommit(conn, db.SQL_AUTOCOMMIT_OFF)
+        for path in args:
+            for sql in statements(path):
+                start = time.time()
+                if db.exec_immediate(conn, sql) == False:
+                    msg = "Failed to execute "+sql+": "+db.stmt_errormsg()
+                    if not keepgoing: raise Usage(msg)
+                    print >> sys.stderr, msg
+                    continue
+                print "%s (%.3f s)" % (sql, time.time()-start)
+            db.commit(conn)
+        db.close(conn)
+
+    except Usage, err:
+        print >> sys.stderr, sys.argv[0].split("/")[-1] + ": " + str(err.msg)
+        print >> sys.stderr, "\t for help use --help"
+        return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
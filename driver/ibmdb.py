@@ -0,0 +1,25 @@
+# encoding: utf-8
+"""
+driver/ibmdb.py
+
+The ibm_db driver (DB2), with the functions that the harnesses call
+on every driver but that ibm_db lacks:
+- fetch_many(stmt, n): the next n rows at most ([] at the end). DB2
+  already sends the rows of a read-only cursor to the client in blocks
+  (blocking), so this only groups the fetch_tuple calls; fetch_row and
+  a count computed by the server avoid the rows altogether.
+"""
+
+from ibm_db import *
+import ibm_db
+
+
+def fetch_many(stmt, n):
+    rows = []
+    fetch_tuple = ibm_db.fetch_tuple
+    for i in xrange(n):
+        row = fetch_tuple(stmt)
+        if row == False:
+            break
+        rows.append(row)
+    return rows
@@ -0,0 +1,286 @@
+# encoding: utf-8
+"""
+driver/sqlite.py
+
+A local stand-in for DB2: the functions of ibm_db used by the
+harnesses, on an SQLite database file (DATABASE.sqlite in the directory
+of the experiment, for the DATABASE of ../db2.py). Failures are
+reported as with ibm_db, by returning False (None for a connection),
+with the message in stmt_errormsg() or conn_errormsg().
+
+The same sql files run on both, through shims of the DB2 dialect:
+- SET CURRENT ISOLATION and ALTER TABLE ... LOCKSIZE are ignored (SQLite
+  transactions are serializable, and lock the database).
+- LOCK TABLE ... IN EXCLUSIVE MODE begins an exclusive transaction.
+- SELECT ... FOR UPDATE, INSERT, UPDATE and DELETE begin an immediate
+  transaction (the database is locked for writing at the first
+  statement rather than at the first write, so that concurrent
+  transactions wait for each other instead of deadlocking).
+- The tablespace of CREATE TABLE (IN userspace2) and the CLUSTER and
+  PCTFREE of CREATE INDEX are dropped.
+- LOAD FROM "file" OF DEL MODIFIED BY COLDEL| METHOD P (1, 2, 3) INSERT
+  INTO table inserts the fields of each line of the file (as written by
+  gentable, its header skipped) into table.
+- Trailing semicolons are dropped.
+"""
+
+import re
+import sqlite3
+
+from datagen.loadfile import isheader
+
+SQL_AUTOCOMMIT_OFF = 0
+SQL_AUTOCOMMIT_ON  = 1
+TIMEOUT = 600       # Seconds a statement waits for a lock held by another connection
+
+IGNORED = re.compile(r'^\s*(set\s+current\s+isolation|alter\s+table\s+\S+\s+locksize)\b', re.I)
+LOCK    = re.compile(r'^\s*lock\s+table\b', re.I)
+WRITE   = re.compile(r'^\s*(insert|update|delete)\b', re.I)
+FORUPDATE  = re.compile(r'\s+for\s+update(\s+of\s+[\w\s,]+)?$', re.I)
+TABLESPACE = re.compile(r'^(\s*create\s+table\b.*\))\s*in\s+\w+$', re.I | re.S)
+INDEXOPTS  = re.compile(r'\s+(cluster|pctfree\s+\d+)\b', re.I)
+CREATEINDEX = re.compile(r'^\s*create\s+(unique\s+)?index\b', re.I)
+LOAD = re.compile(r'^\s*load\s+from\s+"?([^"\s]+)"?\s+of\s+del'
+                  r'(?:\s+modified\s+by\s+coldel(\S))?'
+                  r'(?:\s+method\s+p\s*\(([\d\s,]+)\))?'
+                  r'\s+(insert|replace)\s+into\s+(\w+)\s*$', re.I)
+
+errormsg = ''
+
+
+def translate(sql):
+    # (statement, begin): the SQLite statement for a DB2 one (None if
+    # ignored), and how its transaction begins ('IMMEDIATE',
+    # 'EXCLUSIVE' or '' for deferred)
+    sql = sql.strip().rstrip(';').strip()
+    if IGNORED.match(sql):
+        return None, ''
+    if LOCK.match(sql):
+        return None, 'EXCLUSIVE'
+    if FORUPDATE.search(sql):
+        return FORUPDATE.sub('', sql), 'IMMEDIATE'
+    if WRITE.match(sql) or LOAD.match(sql):
+        return sql, 'IMMEDIATE'
+    sql = TABLESPACE.sub(r'\1', sql)
+    if CREATEINDEX.match(sql):
+        sql = INDEXOPTS.sub('', sql)
+    return sql, ''
+
+
+class Connection(object):
+    # An SQLite connection, whose transactions are begun here: ibm_db
+    # commits after each statement unless autocommit is turned off
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path, TIMEOUT, isolation_level=None, check_same_thread=False)
+        self.db.text_factory = str
+        self.autocommit = True
+        self.begun = False
+        self.statements = []
+        try:
+            # readers do not wait for the writers
+            self.db.execute('PRAGMA journal_mode=WAL')
+        except sqlite3.Error:
+            pass
+
+    def begin(self, mode):
+        # begins a transaction, unless one is already begun
+        if not self.begun:
+            self.db.execute('BEGIN '+mode)
+            self.begun = True
+
+    def release(self):
+        # closes the cursors of the statements, as DB2 does at the end of
+        # a transaction (a cursor not fetched to the end holds its statement)
+        for stmt in self.statements:
+            stmt.release()
+
+    def commit(self):
+        self.release()
+        if self.begun:
+            self.db.execute('COMMIT')
+            self.begun = False
+
+    def rollback(self):
+        self.release()
+        if self.begun:
+            self.db.execute('ROLLBACK')
+            self.begun = False
+
+
+class Statement(object):
+    # A prepared statement (SQLite caches the compiled statements of a
+    # connection), and the cursor of its last execution
+    def __init__(self, conn, sql):
+        self.conn = conn
+        self.sql, self.begin = translate(sql)
+        self.cursor = None
+        self.error = ''
+        conn.statements.append(self)
+
+    def release(self):
+        if self.cursor is not None:
+            self.cursor.close()
+            self.cursor = None
+
+
+def path(database):
+    # file of database, also given as a DB2 connection string
+    m = re.search(r'DATABASE=([^;]*)', database, re.I)
+    if m:
+        database = m.group(1)
+    if database.endswith('.sqlite') or '/' in database:
+        return database
+    return database + '.sqlite'
+
+def pconnect(database, user='', password='', options=None):
+    global errormsg
+    try:
+        return Connection(path(database))
+    except sqlite3.Error, e:
+        errormsg = str(e)
+        return None
+
+connect = pconnect
+
+def conn_errormsg(conn=None):
+    return errormsg
+
+def stmt_errormsg(stmt=None):
+    if stmt is not None:
+        return stmt.error
+    return errormsg
+
+def autocommit(conn, value=None):
+    if value is None:
+        return int(conn.autocommit)
+    if value == SQL_AUTOCOMMIT_ON and conn.begun:
+        conn.commit()
+    conn.autocommit = (value == SQL_AUTOCOMMIT_ON)
+    return True
+
+def prepare(conn, sql):
+    global errormsg
+    stmt = Statement(conn, sql)
+    if stmt.sql is not None and not LOAD.match(stmt.sql):
+        try:
+            # compiled (and checked) now, rather than at the first execution
+            conn.db.execute('EXPLAIN '+stmt.sql, (None,)*stmt.sql.count('?'))
+        except sqlite3.Error, e:
+            errormsg = str(e)
+            return False
+    return stmt
+
+def run(stmt, many, f, *args):
+    # f(*args) in the transaction of stmt. With autocommit, SQLite commits
+    # each statement, and so each row of an array or a load (many) unless
+    # they are run in a transaction of their own
+    global errormsg
+    conn = stmt.conn
+    own = conn.autocommit and many
+    stmt.release()
+    try:
+        if own or not conn.autocommit:
+            conn.begin(stmt.begin)
+        stmt.cursor = f(*args)
+        if own:
+            conn.commit()
+    except (sqlite3.Error, IOError), e:
+        stmt.error = errormsg = str(e)
+        if own:
+            conn.rollback()
+        return False
+    return True
+
+def execute(stmt, params=()):
+    if stmt.sql is None:
+        # ignored, or a table lock (until the end of the transaction)
+        if stmt.begin and not stmt.conn.autocommit:
+            return run(stmt, False, lambda: None)
+        return True
+    m = LOAD.match(stmt.sql)
+    if m:
+        return run(stmt, True, load, stmt.conn, *m.groups())
+    return run(stmt, False, stmt.conn.db.execute, stmt.sql, params or ())
+
+def exec_immediate(conn, sql):
+    stmt = prepare(conn, sql)
+    if stmt == False or execute(stmt) == False:
+        return False
+    return stmt
+
+def execute_many(stmt, rows):
+    # the number of rows written (False on failure)
+    if run(stmt, True, stmt.conn.db.executemany, stmt.sql, rows) == False:
+        return False
+    return len(rows)
+
+def fetch_tuple(stmt):
+    row = None
+    if stmt.cursor is not None:
+        row = stmt.cursor.fetchone()
+    if row is None:
+        return False
+    return row
+
+def fetch_row(stmt):
+    # advances to the next row (True), False at the end of the result set
+    # (the row is built by the sqlite3 module all the same)
+    return fetch_tuple(stmt) != False
+
+def fetch_many(stmt, n):
+    # the next n rows at most, fetched by SQLite in one call ([] at the end)
+    if stmt.cursor is None:
+        return []
+    return stmt.cursor.fetchmany(n)
+
+def num_rows(stmt):
+    if stmt.cursor is None:
+        return -1
+    return stmt.cursor.rowcount
+
+def commit(conn):
+    conn.commit()
+    return True
+
+def rollback(conn):
+    conn.rollback()
+    return True
+
+def close(conn):
+    conn.rollback()
+    conn.db.close()
+    return True
+
+
+def rows(f, delimiter, positions):
+    # fields at positions (1-based, all if None) of the lines of load file f
+    first = True
+    for line in f:
+        line = line.rstrip('\r\n')
+        if not line:
+            continue
+        fields = line.split(delimiter)
+        if first:
+            first = False
+            if isheader(fields):
+                continue
+        if positions is not None:
+            fields = [fields[i-1] for i in positions]
+        yield fields
+
+def load(conn, filename, delimiter, positions, mode, table):
+    # LOAD FROM filename OF DEL ... INSERT|REPLACE INTO table
+    if positions is not None:
+        positions = [int(i) for i in positions.split(',')]
+    f = open(filename)
+    try:
+        first = f.readline()
+        f.seek(0)
+        n = len(positions or first.rstrip('\r\n').split(delimiter or ','))
+        if mode.lower() == 'replace':
+            conn.db.execute('DELETE FROM '+table)
+        return conn.db.executemany('INSERT INTO '+table+' VALUES ('+', '.join(['?']*n)+')',
+                                   rows(f, delimiter or ',', positions))
+    finally:
+        f.close()
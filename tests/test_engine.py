@@ -0,0 +1,56 @@
+# encoding: utf-8
+"""
+tests/test_engine.py
+
+The correlation of corr:N[:strength] columns with column N.
+
+python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from datagen import engine
+
+NUMROWS = 20000
+
+
+def pearson(xs, ys):
+    n = float(len(xs))
+    mx, my = sum(xs)/n, sum(ys)/n
+    sxy = sum((x-mx)*(y-my) for x, y in zip(xs, ys))
+    sxx = sum((x-mx)**2 for x in xs)
+    syy = sum((y-my)**2 for y in ys)
+    return sxy/(sxx*syy)**0.5
+
+
+class CorrelationTest(unittest.TestCase):
+    engine = 'python'
+
+    def correlation(self, strength):
+        colspecs = [['n', '1.0'], ['n', '500.0', '0', 'corr:0:%s' % strength]]
+        columns = engine.gencolumns(NUMROWS, 2, colspecs, 1, self.engine, 1)
+        return pearson([float(v) for v in columns[0].numbers(0, NUMROWS)],
+                       [float(v) for v in columns[1].numbers(0, NUMROWS)])
+
+    def test_strength1(self):
+        self.assertTrue(self.correlation(1) > 0.99)
+
+    def test_strength0(self):
+        self.assertTrue(abs(self.correlation(0)) < 0.05)
+
+    def test_strength(self):
+        self.assertTrue(abs(self.correlation(0.5) - 0.5) < 0.05)
+
+
+@unittest.skipIf(engine.numpy is None, "numpy is not installed")
+class NumpyCorrelationTest(CorrelationTest):
+    engine = 'numpy'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+# encoding: utf-8
+"""
+tests/test_writes.py
+
+The updates of LogIO/writes.py, on a local SQLite database.
+
+python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'LogIO'))
+
+import writes
+from datagen import cli
+from driver import sqlite
+
+
+class UpdateTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.data = os.path.join(self.dir, 'accounts.data')
+        self.spec = os.path.join(ROOT, 'LogIO', 'accountspec')
+        cli.main(['gentable', '-S1', '1000', self.data, self.spec, '1'])
+        self.conn = sqlite.pconnect(os.path.join(self.dir, 'accounts.sqlite'))
+        for sql in [open(os.path.join(ROOT, 'LogIO', 'init.sql')).read(),
+                    'load from "'+self.data+'" of del modified by coldel| method P (1, 2, 3) insert into accounts',
+                    'update accounts set balance = -1']:
+            self.assertNotEqual(sqlite.exec_immediate(self.conn, sql), False)
+
+    def tearDown(self):
+        sqlite.close(self.conn)
+        shutil.rmtree(self.dir)
+
+    def test_loadfile_update(self):
+        # -a2 -a0 with updateN.sql: each update sets the balance of the
+        # account sampled from the load file to its balance in the file
+        writes.WRITE_MODE = 'updateN'
+        writes.ATTLIST = [2, 0]
+        writes.NBWRITES, writes.NBTUPLES, writes.SPECFILE = 200, 1000, self.spec
+        writes.WARMUP, writes.NBRUNS, writes.SEED = 0, 1, 3
+        writes.MANIFEST, writes.LOADFILE = None, self.data
+        stmt = sqlite.prepare(self.conn, open(os.path.join(ROOT, 'LogIO', 'updateN.sql')).read())
+        updates = list(writes.generator())
+        for t in updates:
+            self.assertNotEqual(sqlite.execute(stmt, t), False)
+            self.assertEqual(sqlite.num_rows(stmt), 1)
+        sqlite.commit(self.conn)
+        query = sqlite.prepare(self.conn, 'select balance from accounts where number = ?')
+        for balance, number in updates:
+            sqlite.execute(query, (number,))
+            self.assertEqual(sqlite.fetch_tuple(query)[0], balance)
+
+
+if __name__ == "__main__":
+    unittest.main()